@@ -0,0 +1,159 @@
+import time
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import COMMENTS_PAGE
+
+
+class ApiViewsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test_group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(text='Тестовый текст',
+                                       author=cls.author,
+                                       group=cls.group)
+        Comment.objects.create(post=cls.post, author=cls.reader,
+                               text='Комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feeds_return_posts(self):
+        """Все ленты отдают посты в JSON."""
+        urls = (
+            reverse('api:index'),
+            reverse('api:group_posts', kwargs={'slug': self.group.slug}),
+            reverse('api:profile',
+                    kwargs={'username': self.author.username}),
+            reverse('api:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                results = response.json()['results']
+                self.assertEqual(results[0]['id'], self.post.id)
+                self.assertEqual(results[0]['group'], self.group.slug)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_post_and_comments(self):
+        """Пост и его комментарии."""
+        response = self.client.get(
+            reverse('api:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.json()['comments_count'], 1)
+        response = self.client.get(
+            reverse('api:comments', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.json()['results'][0]['author'],
+                         self.reader.username)
+
+    def test_follow_requires_auth(self):
+        """Лента подписок без авторизации отвечает 401."""
+        response = self.client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_conditional_get(self):
+        """Повторный опрос с тем же ETag отвечает 304, пока лента
+        не изменится."""
+        url = reverse('api:index')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_conditional_get_after_comment(self):
+        """Новый комментарий меняет ETag поста."""
+        url = reverse('api:comments', kwargs={'post_id': self.post.id})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Ещё комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_comment_changes_only_post_etag(self):
+        """Комментарий меняет ETag поста, но не лент."""
+        feed_url = reverse('api:index')
+        post_url = reverse('api:post_detail',
+                           kwargs={'post_id': self.post.id})
+        feed_etag = self.client.get(feed_url)['ETag']
+        post_etag = self.client.get(post_url)['ETag']
+        comment = Comment.objects.create(post=self.post, author=self.author,
+                                         text='Ещё комментарий')
+        response = self.client.get(feed_url, HTTP_IF_NONE_MATCH=feed_etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.client.get(post_url, HTTP_IF_NONE_MATCH=post_etag)
+        self.assertEqual(response.json()['comments_count'], 2)
+        post_etag = response['ETag']
+        comment.delete()
+        response = self.client.get(post_url, HTTP_IF_NONE_MATCH=post_etag)
+        self.assertEqual(response.json()['comments_count'], 1)
+        self.assertNotIn('comments_count',
+                         self.client.get(feed_url).json()['results'][0])
+
+    def test_last_modified_follows_edits(self):
+        """Клиент с одним If-Modified-Since видит правку старого поста."""
+        url = reverse('api:index')
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        with mock.patch.object(time, 'time', return_value=time.time() + 5):
+            self.post.text = 'Исправленный текст'
+            self.post.save()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response.json()['results'][0]['text'],
+                         'Исправленный текст')
+
+    def test_cache_control(self):
+        """Лента подписок — только приватный кэш с перепроверкой."""
+        response = self.authorized_client.get(reverse('api:follow_index'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(reverse('api:index'))
+        self.assertIn('public', response['Cache-Control'])
+        response = self.authorized_client.get(reverse('api:index'))
+        self.assertIn('private', response['Cache-Control'])
+
+    def test_feed_next_page_by_cursor(self):
+        """Следующая страница ленты после нумерованной — по курсору."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=self.author)
+            for i in range(10))
+        url = reverse('api:index')
+        first = self.client.get(url).json()
+        self.assertEqual(first['count'], 11)
+        self.assertTrue(first['next'].startswith('?cursor='))
+        second = self.client.get(url + first['next']).json()
+        self.assertEqual(
+            {post['id'] for post in first['results'] + second['results']},
+            set(Post.objects.values_list('pk', flat=True)))
+        self.assertIsNone(second['next'])
+
+    def test_comments_paged_by_cursor(self):
+        """Комментарии листаются курсором, без COUNT(*)."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.author, text=f'Ответ {i}')
+            for i in range(COMMENTS_PAGE))
+        url = reverse('api:comments', kwargs={'post_id': self.post.id})
+        first = self.client.get(url).json()
+        self.assertIsNone(first['count'])
+        self.assertEqual(len(first['results']), COMMENTS_PAGE)
+        second = self.client.get(url + first['next']).json()
+        self.assertEqual(
+            [comment['text'] for comment in second['results']],
+            ['Комментарий'])
+        self.assertIsNone(second['next'])
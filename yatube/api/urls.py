@@ -0,0 +1,26 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    # главная лента
+    path('posts/', views.index, name='index'),
+    # пост по id
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    # комментарии поста
+    path('posts/<int:post_id>/comments/',
+         views.comments,
+         name='comments'),
+    # посты группы
+    path('groups/<slug:slug>/posts/',
+         views.group_posts,
+         name='group_posts'),
+    # посты автора
+    path('profiles/<str:username>/posts/',
+         views.profile,
+         name='profile'),
+    # лента подписок
+    path('follow/', views.follow_index, name='follow_index'),
+]
@@ -0,0 +1,129 @@
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_safe
+
+from posts.caching import (follow_conditions, group_conditions,
+                           index_conditions, post_conditions,
+                           private_revalidated, profile_conditions,
+                           public_for_anonymous)
+from posts.models import Group, Post, User
+from posts.utils import (CURSOR_PARAM, comments_page, padinator_page,
+                         timeline_page)
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def api_login_required(view):
+    """Как login_required, но вместо редиректа отвечает 401."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _json({'detail': 'Требуется авторизация'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _post_data(post):
+    # Без счётчика комментариев: ETag лент меняют только посты,
+    # счётчик отдаёт post_detail с ETag самого поста
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+    }
+
+
+def _comment_data(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+    }
+
+
+def _page_data(page_obj, serialize):
+    if getattr(page_obj.paginator, 'is_cursor', False):
+        next_page = page_obj.next_cursor and f'?cursor={page_obj.next_cursor}'
+        previous_page = (page_obj.previous_cursor
+                         and f'?cursor={page_obj.previous_cursor}')
+        count = None
+    else:
+        # дальше нумерованной страницы листают курсором, как на сайте
+        next_page = page_obj.has_next() and (
+            f'?cursor={page_obj.next_cursor}' if page_obj.next_cursor
+            else f'?page={page_obj.next_page_number()}')
+        previous_page = (page_obj.has_previous()
+                         and f'?page={page_obj.previous_page_number()}')
+        count = page_obj.paginator.count
+    return {
+        'count': count,
+        'next': next_page or None,
+        'previous': previous_page or None,
+        'results': [serialize(obj) for obj in page_obj],
+    }
+
+
+@require_safe
+@public_for_anonymous
+@index_conditions
+def index(request):
+    page_obj = padinator_page(
+        Post.objects.select_related('author', 'group'), request)
+    return _json(_page_data(page_obj, _post_data))
+
+
+@require_safe
+@public_for_anonymous
+@group_conditions
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    page_obj = padinator_page(
+        group.posts.select_related('author', 'group'), request)
+    return _json(_page_data(page_obj, _post_data))
+
+
+@require_safe
+@public_for_anonymous
+@profile_conditions
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    page_obj = padinator_page(
+        author.posts.select_related('author', 'group'), request)
+    return _json(_page_data(page_obj, _post_data))
+
+
+@require_safe
+@private_revalidated
+@api_login_required
+@follow_conditions
+def follow_index(request):
+    page_obj = timeline_page(request.user, request)
+    return _json(_page_data(page_obj, _post_data))
+
+
+@require_safe
+@public_for_anonymous
+@post_conditions
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), pk=post_id)
+    return _json({**_post_data(post),
+                  'comments_count': post.comments_count})
+
+
+@require_safe
+@public_for_anonymous
+@post_conditions
+def comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    page_obj = comments_page(post, request.GET.get(CURSOR_PARAM))
+    return _json(_page_data(page_obj, _comment_data))
@@ -0,0 +1,238 @@
+"""ASGI-вход для Django 2.2.
+
+Django 2.2 не умеет ни ASGI, ни асинхронных view, ни асинхронного ORM.
+AsgiHandler принимает запросы в цикле событий и вызывает Django как
+WSGI-приложение в пуле из ASGI_THREADS потоков: чтение тела запроса
+и отправка ответа медленным клиентам потоки не занимают, а потоковые
+ответы отдаются по частям. Если у потокового ответа есть атрибут
+async_streaming_content (асинхронный итератор, как у posts.live), тело
+отдаётся прямо из цикла событий, не занимая поток на время ожидания.
+
+serve() — простейший HTTP-сервер поверх asyncio для локального запуска
+и замеров (manage.py loadtest); в бою приложение yatube.asgi
+запускается ASGI-сервером, например uvicorn.
+"""
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from io import BytesIO
+from urllib.parse import unquote
+
+from django.conf import settings
+
+
+def _environ(scope, body):
+    """WSGI environ из ASGI scope."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI передаёт путь байтами UTF-8, прочитанными как latin-1
+        'PATH_INFO': scope['path'].encode().decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = environ[name] + separator + value
+        environ[name] = value
+    return environ
+
+
+class AsgiHandler:
+    """ASGI-приложение, вызывающее WSGI-приложение Django в потоках."""
+    def __init__(self, wsgi_application, threads=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            threads or settings.ASGI_THREADS, thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Соединения {scope["type"]} не поддерживаются')
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        status, headers, chunks, response = await loop.run_in_executor(
+            self.executor, self.call, _environ(scope, body))
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': headers})
+        for chunk in chunks:
+            await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': True})
+        if response is not None:
+            content = getattr(response, 'async_streaming_content', None)
+            try:
+                if content is None:
+                    await self.stream(response, send)
+                elif not await self.stream_async(content, receive, send):
+                    return
+            finally:
+                await loop.run_in_executor(self.executor, response.close)
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def stream(self, response, send):
+        """Потоковый ответ: каждая часть готовится в пуле потоков."""
+        loop = asyncio.get_running_loop()
+        iterator = iter(response)
+        while True:
+            chunk = await loop.run_in_executor(
+                self.executor, next, iterator, None)
+            if chunk is None:
+                return
+            await send({'type': 'http.response.body', 'body': chunk,
+                        'more_body': True})
+
+    async def stream_async(self, content, receive, send):
+        """Асинхронное тело; False, если клиент отключился раньше конца."""
+        iterator = content.__aiter__()
+
+        async def forward():
+            async for chunk in iterator:
+                await send({'type': 'http.response.body', 'body': chunk,
+                            'more_body': True})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        sending = asyncio.ensure_future(forward())
+        watching = asyncio.ensure_future(disconnected())
+        try:
+            await asyncio.wait((sending, watching),
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (sending, watching):
+                task.cancel()
+            await asyncio.gather(sending, watching, return_exceptions=True)
+            await iterator.aclose()
+        if sending.cancelled():
+            return False
+        sending.result()
+        return True
+
+    def call(self, environ):
+        """Вызывает Django; обычный ответ собирается и закрывается здесь.
+
+        close() шлёт request_finished, закрывающий соединения с базой
+        текущего потока, — поэтому в том же потоке, что и запрос.
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [int(status.split(' ', 1)[0]), [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers]]
+
+        response = self.wsgi_application(environ, start_response)
+        if getattr(response, 'streaming', False):
+            return (*started, [], response)
+        try:
+            return (*started, list(response), None)
+        finally:
+            response.close()
+
+    async def read_body(self, receive):
+        """Тело запроса или None, если клиент отключился."""
+        body = BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                return body.getvalue()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+async def _serve_connection(application, reader, writer):
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+        request_line, *lines = head.decode('latin1').split('\r\n')[:-2]
+        method, target, version = request_line.split(' ')
+        headers = [(name.strip().lower().encode('latin1'),
+                    value.strip().encode('latin1'))
+                   for name, value in (line.split(':', 1) for line in lines)]
+        length = int(dict(headers).get(b'content-length', 0))
+        body = await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+            ValueError):
+        writer.close()
+        return
+    path, _, query = target.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': version.split('/')[1],
+        'method': method,
+        'scheme': 'http',
+        'path': unquote(path),
+        'raw_path': path.encode('latin1'),
+        'query_string': query.encode('latin1'),
+        'root_path': '',
+        'headers': headers,
+        'server': writer.get_extra_info('sockname')[:2],
+        'client': writer.get_extra_info('peername')[:2],
+    }
+    messages = [{'type': 'http.request', 'body': body}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # ответ дописан или клиент ушёл: больше сообщений не будет
+        await reader.read()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status = HTTPStatus(message['status'])
+            writer.write(
+                f'HTTP/1.1 {status.value} {status.phrase}\r\n'.encode()
+                + b''.join(name + b': ' + value + b'\r\n'
+                           for name, value in message['headers'])
+                + b'Connection: close\r\n\r\n')
+        else:
+            writer.write(message.get('body', b''))
+        await writer.drain()
+
+    try:
+        await application(scope, receive, send)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(application, host='127.0.0.1', port=8000):
+    """Запускает HTTP/1.1-сервер без keep-alive; возвращает asyncio.Server."""
+    return await asyncio.start_server(
+        lambda reader, writer: _serve_connection(application, reader,
+                                                 writer),
+        host, port)
@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def live_updates(request):
+    """Включены ли живые обновления лент (posts.live)."""
+    return {
+        'live_updates': settings.LIVE_UPDATES
+    }
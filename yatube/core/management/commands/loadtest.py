@@ -0,0 +1,113 @@
+import asyncio
+import http.client
+import math
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler)
+
+from core.asgi import AsgiHandler, serve
+from yatube.wsgi import application
+
+SERVERS = ('wsgi', 'asgi')
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class WsgiServer:
+    """Многопоточный WSGI-сервер Django, как у runserver."""
+    def __enter__(self):
+        self.server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+        self.server.set_app(application)
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        return self.server.server_address[1]
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class AsgiServer:
+    """yatube.asgi на core.asgi.serve в отдельном цикле событий."""
+    def __init__(self, threads):
+        self.application = AsgiHandler(application, threads)
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            serve(self.application, port=0), self.loop).result()
+        return self.server.sockets[0].getsockname()[1]
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.application.executor.shutdown()
+
+
+def fetch(port, path):
+    """Один GET на новом соединении: время в мс и код ответа."""
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        connection.request('GET', path, headers={'Connection': 'close'})
+        response = connection.getresponse()
+        response.read()
+        return (time.perf_counter() - started) * 1000, response.status
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = ('Нагружает сайт одинаковым генератором через WSGI- и '
+            'ASGI-сервер и сравнивает пропускную способность и задержки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=SERVERS, action='append',
+                            help='Какой вход проверять (по умолчанию оба)')
+        parser.add_argument('--path', action='append',
+                            help='Адрес; можно указать несколько раз')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Запросов к каждому адресу')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Одновременных клиентов')
+        parser.add_argument('--threads', type=int, default=None,
+                            help='Потоков Django в ASGI (ASGI_THREADS)')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"сервер":<8}{"адрес":<24}{"запр./с":>10}{"p50, мс":>10}'
+            f'{"p95, мс":>10}{"ошибок":>8}')
+        for name in options['server'] or SERVERS:
+            server = (WsgiServer() if name == 'wsgi'
+                      else AsgiServer(options['threads']))
+            with server as port:
+                for path in options['path'] or ['/']:
+                    self.report(name, path, self.load(port, path, options))
+
+    def load(self, port, path, options):
+        fetch(port, path)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as clients:
+            results = list(clients.map(
+                lambda _: fetch(port, path), range(options['requests'])))
+        elapsed = time.perf_counter() - started
+        return elapsed, results
+
+    def report(self, name, path, load):
+        elapsed, results = load
+        timings = sorted(timing for timing, _ in results)
+        errors = sum(status >= 500 for _, status in results)
+        p95 = timings[math.ceil(0.95 * len(timings)) - 1]
+        self.stdout.write(
+            f'{name:<8}{path:<24}{len(results) / elapsed:>10.0f}'
+            f'{statistics.median(timings):>10.1f}{p95:>10.1f}'
+            f'{errors:>8}')
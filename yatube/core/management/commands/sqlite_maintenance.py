@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = ('Обслуживание SQLite: PRAGMA optimize и перенос WAL '
+            'в основной файл базы')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=None,
+            help='Повторять каждые N секунд вместо однократного запуска')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('База данных — не SQLite')
+        while True:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA optimize')
+                cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                busy, log_pages, checkpointed = cursor.fetchone()
+            self.stdout.write(
+                f'WAL: страниц {log_pages}, перенесено {checkpointed}'
+                + (', база занята' if busy else ''))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,71 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from yatube.settings import PROFILES
+
+# Выполняется в чистом процессе: импорт wsgi.py и первый запрос
+CHILD = '''
+import json, sys, time
+started = time.perf_counter()
+from yatube.wsgi import application
+loaded = time.perf_counter()
+from wsgiref.util import setup_testing_defaults
+environ = {'PATH_INFO': sys.argv[1], 'HTTP_HOST': '127.0.0.1'}
+setup_testing_defaults(environ)
+statuses = []
+b''.join(application(
+    environ, lambda status, headers, exc_info=None: statuses.append(status)))
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (loaded - started) * 1000,
+    'first_request_ms': (finished - loaded) * 1000,
+    'total_ms': (finished - started) * 1000,
+    'status': statuses[0],
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = ('Замеряет холодный старт: импорт wsgi.application и первый '
+            'запрос в новом процессе Python')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--env', choices=PROFILES,
+                            default=os.environ.get('YATUBE_ENV', 'dev'),
+                            help='Профиль настроек')
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Сколько процессов запустить')
+        parser.add_argument('--path', default='/',
+                            help='Адрес первого запроса')
+
+    def handle(self, *args, **options):
+        environ = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'yatube.settings',
+            'YATUBE_ENV': options['env'],
+        }
+        # prod не запустится без обязательных переменных окружения
+        environ.setdefault('YATUBE_SECRET_KEY', 'startup-benchmark')
+        environ.setdefault('YATUBE_ALLOWED_HOSTS', '127.0.0.1')
+        runs = []
+        for _ in range(options['runs']):
+            child = subprocess.run(
+                [sys.executable, '-c', CHILD, options['path']],
+                cwd=settings.BASE_DIR, env=environ,
+                capture_output=True, text=True)
+            if child.returncode:
+                raise CommandError(child.stderr)
+            runs.append(json.loads(child.stdout.splitlines()[-1]))
+        self.stdout.write(f'{options["env"]} {options["path"]} '
+                          f'{runs[0]["status"]}, мс:')
+        for key in ('import_ms', 'first_request_ms', 'total_ms'):
+            values = [run[key] for run in runs]
+            self.stdout.write(
+                f'{key:<18}p50 {statistics.median(values):>7.1f}'
+                f'  max {max(values):>7.1f}')
@@ -0,0 +1,31 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную SQLite-базу в файлы реплик: '
+            'локальная замена репликации для проверки роутера')
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*',
+                            help='Алиасы реплик; по умолчанию все, '
+                                 'кроме default')
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Основная база — не SQLite')
+        aliases = options['aliases'] or [
+            alias for alias in connections if alias != PRIMARY]
+        primary.ensure_connection()
+        for alias in aliases:
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias}: скопировано')
@@ -0,0 +1,97 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from .performance import (current_metrics, finish_request, record,
+                          sql_timer, start_request)
+from .queries import report_repeats
+from .routers import PIN_COOKIE, track_request, untrack_request
+
+logger = logging.getLogger('yatube.performance')
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+class QueryLogMiddleware:
+    """Считает SQL каждого запроса и ведёт журнал yatube.queries.
+
+    Медленные запросы, повторы и N+1 пишутся в журнал (core.queries);
+    число и время SQL копятся в метриках запроса для
+    PerformanceMiddleware. Ставится первым в MIDDLEWARE и остаётся
+    и в боевом профиле.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics, token = start_request(request)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(sql_timer))
+                response = self.get_response(request)
+        finally:
+            finish_request(token)
+        if metrics.statements is not None:
+            report_repeats(request, _view_name(request),
+                           metrics.statements)
+        return response
+
+
+class PerformanceMiddleware:
+    """Замеряет каждый запрос.
+
+    Итог попадает в заголовок Server-Timing, в лог yatube.performance
+    одной JSON-строкой и в сводку core:performance_stats. Метрики
+    заводит QueryLogMiddleware, поэтому ставится сразу после него;
+    без него ничего не замеряет.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = current_metrics()
+        if metrics is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        metrics.total_time = (time.perf_counter() - started) * 1000
+        metrics.view = _view_name(request)
+        response['Server-Timing'] = metrics.server_timing()
+        record(metrics)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }, ensure_ascii=False))
+        return response
+
+
+class ReplicaPinMiddleware:
+    """Читать из основной базы, пока реплики не догнали свою запись.
+
+    Ставится до SessionMiddleware: сессия тоже читается через роутер.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state, token = track_request(PIN_COOKIE in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            untrack_request(token)
+        if state.wrote:
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_MAX_LAG,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,295 @@
+"""Замеры производительности запросов.
+
+Метрики текущего запроса лежат в contextvar: их пополняют обёртка
+SQL-запросов, шаблонный движок и кэш из этого модуля. Заводит их
+core.middleware.QueryLogMiddleware, публикует PerformanceMiddleware.
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache.backends import filebased
+from django.template import TemplateDoesNotExist, engines
+from django.template.backends import django as django_backend
+from django.template.base import Template
+
+from .queries import check_slow, query_origin, sampled
+
+# Сколько последних замеров каждой view хранится для перцентилей
+RECENT_REQUESTS = 1000
+
+_current = ContextVar('request_metrics', default=None)
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Метрики одного запроса; время — в миллисекундах."""
+    def __init__(self, path):
+        self.path = path
+        self.view = None
+        self.total_time = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # SQL с происхождением, если запрос попал в выборку
+        self.statements = [] if sampled() else None
+        self._rendering = False
+        # время по шаблонам, если включён TEMPLATE_PROFILING
+        self.templates = ({} if getattr(settings, 'TEMPLATE_PROFILING',
+                                        False) else None)
+        self._nested = []
+
+    def add_template(self, name, duration, own):
+        count, total, total_own = self.templates.get(name, (0, 0.0, 0.0))
+        self.templates[name] = (count + 1, total + duration,
+                                total_own + own)
+
+    def as_dict(self):
+        result = {
+            'view': self.view,
+            'total_ms': round(self.total_time, 1),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time, 1),
+            'template_ms': round(self.template_time, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+        if self.templates is not None:
+            result['templates'] = _template_report(self.templates)
+        return result
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        return ', '.join((
+            f'total;dur={self.total_time:.1f}',
+            f'db;dur={self.sql_time:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+        ))
+
+
+def current_metrics():
+    return _current.get()
+
+
+def start_request(request):
+    metrics = RequestMetrics(request.path)
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def _elapsed(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def sql_timer(execute, sql, params, many, context):
+    """Обёртка connection.execute_wrapper: число и время запросов."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = _elapsed(started)
+        metrics.queries += 1
+        metrics.sql_time += duration
+        check_slow(sql, params, duration, metrics.path)
+        if metrics.statements is not None:
+            metrics.statements.append((sql, params, query_origin()))
+
+
+class TimedTemplate(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # вложенный render_to_string уже учтён во внешнем
+        if metrics is None or metrics._rendering:
+            return super().render(context, request)
+        metrics._rendering = True
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_time += _elapsed(started)
+            metrics._rendering = False
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонный движок Django, замеряющий время рендера."""
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(
+                self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def _template_report(templates, count=1):
+    """Шаблоны по убыванию собственного времени; count — число запросов."""
+    return {
+        name: {
+            'renders': round(renders / count, 1),
+            'ms': round(total / count, 2),
+            'own_ms': round(own / count, 2),
+        }
+        for name, (renders, total, own) in sorted(
+            templates.items(), key=lambda item: -item[1][2])
+    }
+
+
+def _profiled(render):
+    def profiled_render(template, context):
+        metrics = _current.get()
+        if metrics is None or metrics.templates is None:
+            return render(template, context)
+        # время вложенных шаблонов (include, extends) копится в стеке,
+        # чтобы отделить собственное время шаблона
+        metrics._nested.append(0.0)
+        started = time.perf_counter()
+        try:
+            return render(template, context)
+        finally:
+            duration = _elapsed(started)
+            nested = metrics._nested.pop()
+            if metrics._nested:
+                metrics._nested[-1] += duration
+            metrics.add_template(template.name or '<string>', duration,
+                                 duration - nested)
+    profiled_render.profiled = True
+    return profiled_render
+
+
+def profile_templates():
+    """Включает замер каждого шаблона, в том числе include и extends.
+
+    Замеряется Template._render: через него рендерятся и вложенные
+    шаблоны, которые проходят мимо движка. Время вложенного шаблона
+    входит в ms родителя, own_ms — без вложенных.
+    """
+    if not getattr(Template._render, 'profiled', False):
+        Template._render = _profiled(Template._render)
+
+
+def preload_templates():
+    """Компилирует все шаблоны в кэширующий загрузчик; возвращает число.
+
+    Без кэширующего загрузчика ничего не делает: скомпилированные
+    шаблоны негде хранить.
+    """
+    total = 0
+    for backend in engines.all():
+        for loader in backend.engine.template_loaders:
+            if not hasattr(loader, 'get_template_cache'):
+                continue
+            for directory in _template_dirs(loader.loaders):
+                for root, _, files in os.walk(directory):
+                    for name in files:
+                        if name.endswith(('.html', '.txt')):
+                            backend.get_template(os.path.relpath(
+                                os.path.join(root, name), directory))
+                            total += 1
+    return total
+
+
+def _template_dirs(loaders):
+    for loader in loaders:
+        yield from getattr(loader, 'get_dirs', tuple)()
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """Файловый кэш, считающий попадания и промахи."""
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        metrics = _current.get()
+        if metrics is not None:
+            if value is _MISSING:
+                metrics.cache_misses += 1
+            else:
+                metrics.cache_hits += 1
+        return default if value is _MISSING else value
+
+
+class ViewStats:
+    """Накопленные метрики view в пределах процесса."""
+    def __init__(self):
+        self.count = 0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.max_time = 0.0
+        self.recent = deque(maxlen=RECENT_REQUESTS)
+        self.templates = {}
+        self.profiled = 0
+
+    def add(self, metrics):
+        self.count += 1
+        self.queries += metrics.queries
+        self.sql_time += metrics.sql_time
+        self.template_time += metrics.template_time
+        self.cache_hits += metrics.cache_hits
+        self.cache_misses += metrics.cache_misses
+        self.max_time = max(self.max_time, metrics.total_time)
+        self.recent.append(metrics.total_time)
+        if metrics.templates is not None:
+            self.profiled += 1
+            for name, (count, total, own) in metrics.templates.items():
+                renders, summed, summed_own = self.templates.get(
+                    name, (0, 0.0, 0.0))
+                self.templates[name] = (renders + count, summed + total,
+                                        summed_own + own)
+
+    def as_dict(self):
+        recent = sorted(self.recent)
+        result = {
+            'count': self.count,
+            'p50_ms': round(recent[len(recent) // 2], 1),
+            'p95_ms': round(recent[int(len(recent) * 0.95)], 1),
+            'max_ms': round(self.max_time, 1),
+            'avg_queries': round(self.queries / self.count, 1),
+            'avg_sql_ms': round(self.sql_time / self.count, 1),
+            'avg_template_ms': round(self.template_time / self.count, 1),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+        if self.profiled:
+            # среднее на один профилированный запрос
+            result['templates'] = _template_report(self.templates,
+                                                   self.profiled)
+        return result
+
+
+_stats = defaultdict(ViewStats)
+_stats_lock = threading.Lock()
+
+
+def record(metrics):
+    with _stats_lock:
+        _stats[metrics.view].add(metrics)
+
+
+def stats():
+    """Сводка по view, самые медленные по p95 — первыми."""
+    with _stats_lock:
+        summary = {view: view_stats.as_dict()
+                   for view, view_stats in _stats.items()}
+    return dict(sorted(summary.items(),
+                       key=lambda item: -item[1]['p95_ms']))
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
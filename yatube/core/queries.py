@@ -0,0 +1,98 @@
+"""Журнал медленных SQL-запросов и поиск повторов.
+
+Медленные запросы пишутся в лог yatube.queries всегда, повторы
+и N+1 ищутся только в доле запросов QUERY_LOG_SAMPLE_RATE:
+на каждый SQL выборки тратится обход стека.
+"""
+import json
+import logging
+import os
+import random
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.template.base import Node
+
+logger = logging.getLogger('yatube.queries')
+
+# Кадры самого замера в происхождение запроса не попадают
+_OWN_FILES = {
+    os.path.join(os.path.dirname(__file__), 'performance.py'),
+    os.path.join(os.path.dirname(__file__), 'middleware.py'),
+    __file__,
+}
+
+
+def sampled():
+    """Разбирать ли SQL этого HTTP-запроса целиком."""
+    return random.random() < settings.QUERY_LOG_SAMPLE_RATE
+
+
+def query_origin():
+    """Строка проекта и узел шаблона, из которых выполнен запрос."""
+    code = template = None
+    frame = sys._getframe(1)
+    while frame is not None and (code is None or template is None):
+        filename = frame.f_code.co_filename
+        if template is None:
+            node = frame.f_locals.get('self')
+            # type(), а не isinstance: ленивый request.user вычислился
+            # бы и выполнил SQL прямо из обёртки
+            if issubclass(type(node), Node) and hasattr(node, 'token'):
+                template = '{}:{}'.format(
+                    node.origin.template_name or node.origin.name,
+                    node.token.lineno)
+        if (code is None and filename.startswith(settings.BASE_DIR)
+                and filename not in _OWN_FILES):
+            code = '{}:{} in {}'.format(
+                os.path.relpath(filename, settings.BASE_DIR),
+                frame.f_lineno, frame.f_code.co_name)
+        frame = frame.f_back
+    return ' <- '.join(filter(None, (template, code)))
+
+
+def check_slow(sql, params, duration, request_path):
+    """Пишет в журнал запрос дольше QUERY_LOG_SLOW_MS."""
+    threshold = settings.QUERY_LOG_SLOW_MS
+    if threshold is None or duration < threshold:
+        return
+    logger.warning(json.dumps({
+        'kind': 'slow',
+        'path': request_path,
+        'ms': round(duration, 1),
+        'sql': sql,
+        'params': params,
+        'origin': query_origin(),
+    }, ensure_ascii=False, default=str))
+
+
+def report_repeats(request, view, statements):
+    """Ищет повторы среди SQL одного HTTP-запроса.
+
+    statements — список (sql, params, origin). Одинаковый SQL с теми же
+    параметрами — duplicate, тот же SQL с разными параметрами
+    QUERY_LOG_REPEATS и более раз — признак N+1.
+    """
+    by_sql = defaultdict(list)
+    for sql, params, origin in statements:
+        by_sql[sql].append((params, origin))
+    found = []
+    for sql, calls in by_sql.items():
+        distinct = {repr(params) for params, origin in calls}
+        if len(distinct) < len(calls):
+            kind = 'duplicate'
+        elif len(calls) >= settings.QUERY_LOG_REPEATS:
+            kind = 'n+1'
+        else:
+            continue
+        found.append(kind)
+        logger.warning(json.dumps({
+            'kind': kind,
+            'path': request.path,
+            'view': view,
+            'count': len(calls),
+            'sql': sql,
+            'origins': sorted({origin for params, origin in calls}),
+        }, ensure_ascii=False))
+    return found
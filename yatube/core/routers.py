@@ -0,0 +1,68 @@
+"""Чтение с реплик, запись — в основную базу.
+
+Запросы на чтение в HTTP-запросах уходят на случайную реплику
+из DATABASE_REPLICAS.
+Чтобы пользователь видел собственные изменения, пока реплики
+догоняют основную базу, ReplicaPinMiddleware после любой записи
+ставит cookie на REPLICA_MAX_LAG секунд; с ней все чтения идут
+в основную базу.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+
+PRIMARY = 'default'
+PIN_COOKIE = 'pin_primary'
+
+
+class RequestState:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar('replica_request_state', default=None)
+
+
+def track_request(pinned):
+    """Начинает учёт записей запроса; pinned — читать из основной базы."""
+    state = RequestState(pinned)
+    return state, _state.set(state)
+
+
+def untrack_request(token):
+    _state.reset(token)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        # вне HTTP-запросов (воркеры, команды) и после записи в том же
+        # запросе читаем из основной базы
+        if (not replicas() or state is None
+                or state.pinned or state.wrote):
+            return PRIMARY
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема и данные попадают на реплики репликацией
+        if db in replicas():
+            return False
+        return None
@@ -0,0 +1,70 @@
+import asyncio
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+from yatube.asgi import application
+
+
+def request(path, query=b'', headers=()):
+    """Прогоняет GET через ASGI-приложение; возвращает сообщения ответа."""
+    scope = {
+        'type': 'http', 'http_version': '1.1', 'method': 'GET',
+        'path': path, 'query_string': query, 'root_path': '',
+        'headers': [(b'host', b'testserver'), *headers],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(application(scope, receive, send))
+    start, *body = sent
+    return start, b''.join(message['body'] for message in body)
+
+
+class AsgiHandlerTest(TransactionTestCase):
+    def setUp(self):
+        # id постов после очистки базы повторяются, а карточки
+        # в кэше хранятся по id и версии
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.reader = User.objects.create_user(username='reader')
+        Post.objects.create(text='Пост через ASGI', author=self.author)
+
+    def test_get_page(self):
+        start, body = request(reverse('posts:index'))
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      start['headers'])
+        self.assertIn('Пост через ASGI', body.decode())
+
+    def test_query_and_cookies(self):
+        """Строка запроса и cookie сессии доходят до view."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.force_login(self.reader)
+        cookie = f'sessionid={self.client.cookies["sessionid"].value}'
+        start, body = request(reverse('posts:follow_index'),
+                              query=b'page=1',
+                              headers=[(b'cookie', cookie.encode())])
+        self.assertEqual(start['status'], 200)
+        self.assertIn('Пост через ASGI', body.decode())
+        start, _ = request(reverse('posts:follow_index'))
+        self.assertEqual(start['status'], 302)
+
+    def test_loadtest_both_servers(self):
+        out = StringIO()
+        call_command('loadtest', requests=4, concurrency=2,
+                     path=[reverse('about:author')], stdout=out)
+        wsgi, asgi = out.getvalue().splitlines()[1:]
+        for line, name in ((wsgi, 'wsgi'), (asgi, 'asgi')):
+            self.assertTrue(line.startswith(name))
+            self.assertTrue(line.endswith(' 0'))
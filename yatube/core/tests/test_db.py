@@ -0,0 +1,23 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+
+class SqliteTuningTest(TestCase):
+    def test_pragmas_applied(self):
+        """Соединение получает PRAGMA из SQLITE_PRAGMAS."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone(), (1,))
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone(), (5000,))
+
+
+class SqliteMaintenanceTest(TransactionTestCase):
+    # checkpoint невозможен внутри транзакции TestCase
+    def test_maintenance(self):
+        out = StringIO()
+        call_command('sqlite_maintenance', stdout=out)
+        self.assertIn('WAL', out.getvalue())
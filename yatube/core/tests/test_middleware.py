@@ -0,0 +1,181 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import Context, Template, engines
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from ..middleware import QueryLogMiddleware
+from ..performance import (preload_templates, profile_templates,
+                           reset_stats, stats)
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.staff = User.objects.create_user(username='staff',
+                                             is_staff=True)
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+
+    def test_server_timing_and_log(self):
+        """Метрики запроса уходят в Server-Timing и в лог."""
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+            response = self.client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        first, second = (json.loads(line.split(':', 2)[2])
+                         for line in logs.output)
+        self.assertEqual(first['view'], 'posts:index')
+        self.assertGreater(first['queries'], 0)
+        self.assertGreater(first['template_ms'], 0)
+        self.assertGreater(second['cache_hits'], first['cache_hits'])
+
+    def test_log_configured(self):
+        """Строки метрик уровня INFO пишутся в свой файл."""
+        logger = logging.getLogger('yatube.performance')
+        self.assertTrue(logger.isEnabledFor(logging.INFO))
+        self.assertEqual(
+            [handler.baseFilename for handler in logger.handlers],
+            [settings.PERFORMANCE_LOG_FILE])
+
+    def test_stats_for_staff_only(self):
+        """Сводка доступна только персоналу."""
+        self.client.get(reverse('posts:index'))
+        url = reverse('core:performance_stats')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        stats = self.client.get(url).json()
+        self.assertEqual(stats['posts:index']['count'], 1)
+
+
+class QueryLogTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [User.objects.create_user(username=f'user{number}')
+                       for number in range(3)]
+        for author in cls.authors:
+            Post.objects.create(text='Тестовый текст', author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def logged(self, get_response):
+        request = RequestFactory().get('/')
+        with self.assertLogs('yatube.queries', 'WARNING') as logs:
+            QueryLogMiddleware(get_response)(request)
+        return [json.loads(line.split(':', 2)[2]) for line in logs.output]
+
+    @override_settings(QUERY_LOG_SAMPLE_RATE=1)
+    def test_n_plus_one_from_template(self):
+        """N+1 из шаблона помечается строкой шаблона и кода."""
+        def view(request):
+            template = Template(
+                '{% for post in posts %}{{ post.author }}{% endfor %}')
+            return HttpResponse(template.render(
+                Context({'posts': Post.objects.all()})))
+
+        entry, = self.logged(view)
+        self.assertEqual(entry['kind'], 'n+1')
+        self.assertEqual(entry['count'], 3)
+        self.assertIn('auth_user', entry['sql'])
+        origin, = entry['origins']
+        self.assertIn('<unknown source>:1', origin)
+        self.assertIn('core/tests/test_middleware.py', origin)
+
+    @override_settings(QUERY_LOG_SAMPLE_RATE=1)
+    def test_duplicate_query(self):
+        def view(request):
+            for _ in range(2):
+                User.objects.get(pk=self.authors[0].pk)
+            return HttpResponse()
+
+        entry, = self.logged(view)
+        self.assertEqual(entry['kind'], 'duplicate')
+
+    @override_settings(QUERY_LOG_SLOW_MS=0, QUERY_LOG_SAMPLE_RATE=0)
+    def test_slow_query_origin(self):
+        """Медленный запрос пишется с местом вызова во view."""
+        with self.assertLogs('yatube.queries', 'WARNING') as logs:
+            self.client.get(reverse('posts:profile',
+                                    args=[self.authors[0].username]))
+        self.assertIn('posts/views.py', '\n'.join(logs.output))
+
+
+class TemplateProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+        # замер подменяет Template._render на весь процесс: остальные
+        # тесты должны получить исходный метод обратно
+        cls.original_render = Template._render
+        profile_templates()
+
+    @classmethod
+    def tearDownClass(cls):
+        Template._render = cls.original_render
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        reset_stats()
+
+    @override_settings(TEMPLATE_PROFILING=True)
+    def test_templates_and_includes_reported(self):
+        """Вложенные шаблоны замеряются отдельно и попадают в сводку."""
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        entry = json.loads(logs.output[0].split(':', 2)[2])
+        templates = entry['templates']
+        for name in ('posts/index.html', 'base.html',
+                     'includes/header.html', 'posts/includes/paginator.html',
+                     'posts/includes/post_card.html'):
+            self.assertIn(name, templates)
+        page = templates['posts/index.html']
+        self.assertGreaterEqual(page['ms'], templates['base.html']['ms'])
+        self.assertLessEqual(page['own_ms'], page['ms'])
+        self.assertIn('base.html', stats()['posts:index']['templates'])
+
+    def test_disabled_by_default(self):
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        self.assertNotIn('templates', logs.output[0])
+
+
+class PreloadTemplatesTest(TestCase):
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'core.performance.DjangoTemplates',
+        'DIRS': [settings.TEMPLATES_DIR],
+        'OPTIONS': {
+            'loaders': [('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ])],
+        },
+    }])
+    def test_cached_loader_filled(self):
+        """Шаблоны проекта и приложений компилируются заранее."""
+        self.assertGreater(preload_templates(), 0)
+        loader, = engines.all()[0].engine.template_loaders
+        for name in ('base.html', 'includes/header.html',
+                     'posts/includes/paginator.html', 'core/404.html',
+                     'admin/base.html'):
+            self.assertIn(name, loader.get_template_cache)
+
+    @override_settings(DEBUG=True)
+    def test_noop_without_cached_loader(self):
+        # при DEBUG Django не включает кэширующий загрузчик сам
+        self.assertEqual(preload_templates(), 0)
@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post, User
+from ..routers import PIN_COOKIE, track_request, untrack_request
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TestCase):
+    def test_routing(self):
+        """Реплики читаются только в запросах без собственной записи."""
+        self.assertEqual(router.db_for_read(Post), 'default')
+        state, token = track_request(pinned=False)
+        try:
+            self.assertEqual(router.db_for_read(Post), 'replica')
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), 'default')
+        finally:
+            untrack_request(token)
+        state, token = track_request(pinned=True)
+        try:
+            self.assertEqual(router.db_for_read(Post), 'default')
+        finally:
+            untrack_request(token)
+
+    def test_no_migrations_on_replica(self):
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReadYourWritesTest(TransactionTestCase):
+    # реплика в тестах — зеркало default, данные должны быть закоммичены
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.client.force_login(self.user)
+
+    def test_author_reads_primary_after_write(self):
+        """После публикации автор читает из default и видит пост."""
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.client.get(reverse('posts:index'))
+        self.assertTrue(replica.captured_queries)
+        response = self.client.post(reverse('posts:post_create'),
+                                    {'text': 'Новый пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(response.url)
+        self.assertFalse(replica.captured_queries)
+        self.assertContains(response, 'Новый пост')
+
+    def test_fresh_feeds_not_cached(self):
+        """Сброшенная записью лента не кэшируется, пока реплики отстают."""
+        self.client.post(reverse('posts:post_create'),
+                         {'text': 'Новый пост'})
+        response = self.client_class().get(reverse('posts:index'))
+        self.assertFalse(response.has_header('ETag'))
+        with override_settings(REPLICA_MAX_LAG=0):
+            response = self.client_class().get(reverse('posts:index'))
+        self.assertTrue(response.has_header('ETag'))
@@ -0,0 +1,31 @@
+import importlib
+import os
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+
+class StartupTimeTest(SimpleTestCase):
+    def test_prod_profile_starts(self):
+        """Профиль prod поднимается и отвечает на первый запрос."""
+        out = StringIO()
+        call_command('startup_time', env='prod', runs=1,
+                     path='/about/author/', stdout=out)
+        report = out.getvalue()
+        self.assertIn('prod /about/author/ 200 OK', report)
+        for key in ('import_ms', 'first_request_ms', 'total_ms'):
+            self.assertIn(key, report)
+
+    def test_prod_keeps_query_log(self):
+        """Без замеров в prod журнал медленных SQL и N+1 остаётся."""
+        environ = {'YATUBE_SECRET_KEY': 'test', 'YATUBE_ALLOWED_HOSTS': 'x'}
+        with mock.patch.dict(os.environ, environ):
+            os.environ.pop('YATUBE_PERFORMANCE', None)
+            prod = importlib.reload(
+                importlib.import_module('yatube.settings.prod'))
+        self.assertEqual(prod.MIDDLEWARE[0],
+                         'core.middleware.QueryLogMiddleware')
+        self.assertNotIn('core.middleware.PerformanceMiddleware',
+                         prod.MIDDLEWARE)
@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+
+app_name = 'core'
+
+urlpatterns = [
+    path('performance/', views.performance_stats,
+         name='performance_stats'),
+]
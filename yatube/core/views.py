@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from .performance import stats
+
 
 def page_not_found(request, exception):
     return render(
@@ -16,3 +20,9 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, "core/500.html", status=500)
+
+
+@staff_member_required
+def performance_stats(request):
+    """Сводка замеров PerformanceMiddleware по view этого процесса."""
+    return JsonResponse(stats(), json_dumps_params={'ensure_ascii': False})
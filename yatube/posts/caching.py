@@ -0,0 +1,260 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from .comment_queue import queued_names
+from .models import Follow, Post
+
+FEED_TIMEOUT = 60 * 60
+# Сколько секунд обратный прокси может отдавать страницу анониму
+PUBLIC_MAX_AGE = 60
+GENERATION_PREFIX = 'feed-generation'
+
+
+def feed_key(name, *parts):
+    """Ключ ленты: index, group:<slug>, profile:<username>, follow:<id>
+    (набор подписок пользователя), author:<id> (посты автора)."""
+    raw = ':'.join([name, *map(str, parts)])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _new_generation():
+    return f'{uuid.uuid4().hex}.{int(time.time())}'
+
+
+def feed_generation(key):
+    """Текущее поколение ленты; страницы старых поколений не читаются."""
+    generation_key = f'{GENERATION_PREFIX}:{key}'
+    generation = cache.get(generation_key)
+    if generation is None:
+        cache.add(generation_key, _new_generation(), None)
+        generation = cache.get(generation_key)
+    return generation
+
+
+def generation_time(generation):
+    """Время создания поколения в секундах или None."""
+    try:
+        return int(generation.rsplit('.', 1)[1])
+    except (IndexError, ValueError):
+        return None
+
+
+def fresh_generation(generation):
+    """Поколение моложе отставания реплик: они могут ещё не знать
+    о записи, сбросившей ленту."""
+    if not settings.DATABASE_REPLICAS:
+        return False
+    created = generation_time(generation)
+    if created is None:
+        return False
+    return time.time() - created < settings.REPLICA_MAX_LAG
+
+
+def bump_feeds(*keys):
+    """Сбрасывает закэшированные страницы перечисленных лент."""
+    generation = _new_generation()
+    cache.set_many(
+        {f'{GENERATION_PREFIX}:{key}': generation for key in keys}, None)
+
+
+def public_feeds(post):
+    """Публичные ленты, в которых показывается пост."""
+    slugs = {getattr(post, '_previous_group_slug', None)}
+    if post.group_id is not None:
+        slugs.add(post.group.slug)
+    return [('index',),
+            ('profile', post.author.username),
+            *(('group', slug) for slug in slugs if slug)]
+
+
+def bump_post_feeds(post):
+    """Сбрасывает публичные ленты поста и поколение его автора.
+
+    Ленты подписчиков не сбрасываются по одной: их поколение
+    собирается при чтении из поколений авторов (follow_generation).
+    """
+    bump_feeds(*(feed_key(*feed) for feed in public_feeds(post)),
+               feed_key('author', post.author_id))
+
+
+def follow_generation(user_id):
+    """Поколение ленты подписок пользователя.
+
+    Складывается из поколения набора подписок (follow:<id>,
+    сбрасывается при подписке и отписке) и поколений авторов
+    (author:<id>, сбрасываются их постами): запись поста стоит
+    одной записи в кэш при любом числе подписчиков.
+    """
+    author_ids = Follow.objects.filter(user_id=user_id).order_by(
+        'author_id').values_list('author_id', flat=True)
+    keys = [f'{GENERATION_PREFIX}:{key}' for key in (
+        feed_key('follow', user_id),
+        *(feed_key('author', author_id) for author_id in author_ids))]
+    generations = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys
+               if key not in generations}
+    if missing:
+        for key, generation in missing.items():
+            cache.add(key, generation, None)
+        generations.update(cache.get_many(list(missing)))
+    parts = [generations.get(key, '') for key in keys]
+    newest = max(filter(None, map(generation_time, parts)), default=0)
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'{digest}.{newest}'
+
+
+def cache_feed(name, kwarg=None, timeout=FEED_TIMEOUT):
+    """cache_page, чей ключ включает поколение ленты.
+
+    kwarg — имя аргумента view, различающего ленты (slug, username).
+    Кэшируются только страницы для анонимов: у авторизованного в
+    странице его имя в шапке и кнопки подписки.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            parts = []
+            if kwarg is not None:
+                parts.append(kwargs[kwarg])
+            key = feed_key(name, *parts)
+            generation = feed_generation(key)
+            if fresh_generation(generation):
+                # страница с реплики может быть устаревшей: не кэшируем
+                response = view(request, *args, **kwargs)
+            else:
+                response = cache_page(
+                    timeout, key_prefix=f'{key}.{generation}')(view)(
+                        request, *args, **kwargs)
+            # срок серверного кэша не должен попадать в заголовки:
+            # политику для браузеров и прокси задаёт public_for_anonymous
+            del response['Expires']
+            del response['Cache-Control']
+            return response
+        return wrapper
+    return decorator
+
+
+def _once(request, name, compute):
+    """ETag и Last-Modified считаются из одного запроса к базе."""
+    computed = request.__dict__.setdefault('_conditions', {})
+    if name not in computed:
+        computed[name] = compute()
+    return computed[name]
+
+
+def _etag(request, *parts):
+    raw = '|'.join(map(str, (*parts, request.user.pk,
+                             request.GET.urlencode())))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def feed_conditions(feed):
+    """Условный GET для ленты.
+
+    Поколение сбрасывается при любом изменении, видном в ленте
+    (новый пост, правка, удаление, подписка), поэтому и ETag,
+    и Last-Modified строятся по нему: Last-Modified — время создания
+    поколения. feed(request, **kwargs) возвращает поколение ленты.
+    """
+    def generation(request, **kwargs):
+        """Поколение ленты; None, пока реплики могут отставать."""
+        generation = _once(request, 'generation',
+                           lambda: feed(request, **kwargs))
+        return None if fresh_generation(generation) else generation
+
+    def last_modified(request, **kwargs):
+        current = generation(request, **kwargs)
+        created = None if current is None else generation_time(current)
+        if created is None:
+            return None
+        return datetime.fromtimestamp(created, timezone.utc)
+
+    def etag(request, **kwargs):
+        current = generation(request, **kwargs)
+        if current is None:
+            return None
+        return _etag(request, current)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+index_conditions = feed_conditions(
+    lambda request: feed_generation(feed_key('index')))
+group_conditions = feed_conditions(
+    lambda request, slug: feed_generation(feed_key('group', slug)))
+profile_conditions = feed_conditions(
+    lambda request, username: feed_generation(
+        feed_key('profile', username)))
+follow_conditions = feed_conditions(
+    lambda request: follow_generation(request.user.pk))
+
+
+def _post_state(request, post_id):
+    return _once(request, 'post', lambda: Post.objects.filter(
+        pk=post_id
+    ).order_by().annotate(
+        last_comment=Max('comments__created')
+    ).values(
+        'pub_date', 'version', 'comments_count', 'last_comment',
+        'author__counters__posts_count'
+    ).first())
+
+
+def _post_last_modified(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    return max(filter(None, (state['pub_date'], state['last_comment'])))
+
+
+def _post_etag(request, post_id):
+    state = _post_state(request, post_id)
+    if state is None:
+        return None
+    # свои комментарии из очереди автор видит до записи в базу
+    return _etag(request, *state.values(),
+                 *queued_names(post_id, request.user.pk))
+
+
+# Условный GET для поста: меняется при правке и новых комментариях
+post_conditions = condition(etag_func=_post_etag,
+                            last_modified_func=_post_last_modified)
+
+
+def public_for_anonymous(view):
+    """Анонимам — публичный кэш на PUBLIC_MAX_AGE, остальным —
+    только приватный с обязательной перепроверкой по ETag."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True,
+                                max_age=PUBLIC_MAX_AGE)
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
+
+
+def private_revalidated(view):
+    """Догрузки «новое с момента since»: общий кэш не должен отдавать
+    их устаревшими, браузер — только с перепроверкой по ETag."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return wrapper
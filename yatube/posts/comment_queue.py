@@ -0,0 +1,177 @@
+"""Отложенная запись комментариев.
+
+Если задан POSTS_COMMENT_QUEUE, add_comment не пишет в базу, а кладёт
+комментарий файлом в каталог очереди: <очередь>/<id поста>/<время>-
+<id автора>-<uuid>.json. manage.py comment_worker забирает файлы
+пачками и сохраняет одним bulk_create, обновляя счётчики один раз
+на пост и добавляя в поисковый индекс слова новых комментариев.
+Доставка — «хотя бы один раз»: если воркер упадёт между коммитом
+и удалением файлов, пачка запишется повторно.
+"""
+import json
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Post, User
+from .search import add_comment_terms
+from .utils import explicit_dates
+
+CLAIMED = '.claimed'
+# Через сколько забранный, но не записанный файл считается брошенным
+STALE_AFTER = timedelta(minutes=10)
+
+
+def enabled():
+    return bool(getattr(settings, 'POSTS_COMMENT_QUEUE', None))
+
+
+def _post_dir(post_id):
+    return os.path.join(settings.POSTS_COMMENT_QUEUE, str(post_id))
+
+
+def enqueue(post_id, author_id, text):
+    """Надёжно сохраняет комментарий в очередь."""
+    directory = _post_dir(post_id)
+    name = f'{time.time_ns()}-{author_id}-{uuid.uuid4().hex}.json'
+    temporary = os.path.join(directory, f'.{name}')
+    while True:
+        os.makedirs(directory, exist_ok=True)
+        try:
+            file = open(temporary, 'w')
+        except FileNotFoundError:
+            # воркер удалил пустой каталог между созданием и записью
+            continue
+        break
+    with file:
+        json.dump({'author': author_id, 'text': text,
+                   'created': timezone.now().isoformat()}, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, os.path.join(directory, name))
+
+
+def _entries(directory):
+    try:
+        return sorted(entry for entry in os.listdir(directory)
+                      if not entry.startswith('.'))
+    except FileNotFoundError:
+        return []
+
+
+def _read(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def queued_names(post_id, author_id):
+    """Имена файлов ещё не записанных комментариев автора к посту."""
+    if not enabled() or author_id is None:
+        return []
+    return [name for name in _entries(_post_dir(post_id))
+            if name.split('-')[1] == str(author_id)]
+
+
+def queued_comments(post, author):
+    """Комментарии автора из очереди: автор видит их сразу."""
+    comments = []
+    for name in queued_names(post.pk, author.pk):
+        try:
+            data = _read(os.path.join(_post_dir(post.pk), name))
+        except (OSError, ValueError):
+            continue
+        comments.append(Comment(post=post, author=author,
+                                text=data['text'],
+                                created=parse_datetime(data['created'])))
+    return comments[::-1]
+
+
+def _remove_if_empty(directory):
+    """Удаляет каталог поста, если в нём не осталось файлов.
+
+    Каталог с недописанным комментарием не пуст и не удаляется.
+    """
+    try:
+        os.rmdir(directory)
+    except OSError:
+        pass
+
+
+def _claim(limit):
+    """Забирает до limit файлов; чужие свежие забранные пропускает."""
+    stale = time.time() - STALE_AFTER.total_seconds()
+    claimed = []
+    for post_dir in _entries(settings.POSTS_COMMENT_QUEUE):
+        directory = os.path.join(settings.POSTS_COMMENT_QUEUE, post_dir)
+        entries = _entries(directory)
+        if not entries:
+            _remove_if_empty(directory)
+        for name in entries:
+            path = os.path.join(directory, name)
+            try:
+                if not name.endswith(CLAIMED):
+                    os.rename(path, path + CLAIMED)
+                    path += CLAIMED
+                elif os.path.getmtime(path) < stale:
+                    os.utime(path)
+                else:
+                    continue
+            except FileNotFoundError:
+                continue
+            claimed.append((int(post_dir), path))
+            if len(claimed) == limit:
+                return claimed
+    return claimed
+
+
+def flush(limit=None):
+    """Записывает пачку из очереди; возвращает число разобранных файлов.
+
+    Комментарии к удалённым постам и от удалённых авторов
+    отбрасываются.
+    """
+    limit = limit or settings.POSTS_COMMENT_BATCH
+    claimed = _claim(limit)
+    if not claimed:
+        return 0
+    comments = []
+    for post_id, path in claimed:
+        try:
+            data = _read(path)
+        except (OSError, ValueError):
+            continue
+        comments.append(Comment(post_id=post_id,
+                                author_id=data['author'],
+                                text=data['text'],
+                                created=parse_datetime(data['created'])))
+    # Пост или автор могли быть удалены, пока комментарий ждал
+    posts = set(Post.objects.filter(
+        pk__in={comment.post_id for comment in comments}
+    ).values_list('pk', flat=True))
+    authors = set(User.objects.filter(
+        pk__in={comment.author_id for comment in comments}
+    ).values_list('pk', flat=True))
+    comments = [comment for comment in comments
+                if comment.post_id in posts and comment.author_id in authors]
+    with transaction.atomic(), explicit_dates(
+            Comment._meta.get_field('created')):
+        Comment.objects.bulk_create(comments)
+        for post_id, count in Counter(
+                comment.post_id for comment in comments).items():
+            Post.objects.filter(pk=post_id).update(
+                comments_count=F('comments_count') + count)
+        for comment in comments:
+            add_comment_terms(comment)
+    for post_id, path in claimed:
+        os.remove(path)
+    for directory in {os.path.dirname(path) for _, path in claimed}:
+        _remove_if_empty(directory)
+    return len(claimed)
@@ -1,6 +1,8 @@
 from django import forms
 
 from .models import Post, Comment
+from .thumbnails import mark_pending
+from .uploads import normalize_image
 
 
 class PostForm(forms.ModelForm):
@@ -18,6 +20,18 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост'
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if image and 'image' in self.changed_data:
+            return normalize_image(image)
+        return image
+
+    def save(self, commit=True):
+        # миниатюры новой картинки соберёт фоновый воркер
+        if 'image' in self.changed_data:
+            mark_pending(self.instance)
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
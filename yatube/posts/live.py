@@ -0,0 +1,164 @@
+"""Живые обновления лент через Server-Sent Events.
+
+Сигналы новых постов и комментариев публикуют события в хаб внутри
+процесса; потоковые view подписываются на каналы и отдают события
+браузеру. Событие несёт только id, сам контент браузер догружает
+маленьким запросом (live_posts, new_comments) вместо перезагрузки
+страницы.
+
+Каналы: index — все посты, author:<id> — посты автора (на них
+подписывается лента подписок), post:<id> — комментарии к посту.
+
+Хаб живёт в памяти процесса: подписчик получает события только
+о записях, сделанных в том же процессе. Комментарии из очереди
+(comment_queue) записывает отдельный воркер, их браузер увидит
+при следующей догрузке. Под WSGI каждый открытый поток событий
+держит поток сервера, под yatube.asgi — только корутину, поэтому
+потоки включает настройка LIVE_UPDATES, которую задаёт yatube.asgi.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+
+
+class Subscription:
+    """Очередь событий одного подписчика.
+
+    Ждать событий можно из потока (get) или из цикла событий (aget).
+    Медленный подписчик теряет самые старые события: содержимое всё
+    равно догружается по токену, а не из события.
+    """
+    def __init__(self, channels):
+        self.channels = channels
+        self.events = deque(maxlen=settings.LIVE_BACKLOG)
+        self.ready = threading.Condition()
+        self._waker = None
+
+    def put(self, message):
+        with self.ready:
+            self.events.append(message)
+            self.ready.notify()
+            waker = self._waker
+        if waker is not None:
+            loop, event = waker
+            loop.call_soon_threadsafe(event.set)
+
+    def _pop(self):
+        with self.ready:
+            return self.events.popleft() if self.events else None
+
+    def get(self, timeout):
+        """Следующее событие или None, если за timeout ничего не пришло."""
+        with self.ready:
+            if not self.events:
+                self.ready.wait(timeout)
+        return self._pop()
+
+    async def aget(self, timeout):
+        event = asyncio.Event()
+        with self.ready:
+            if self.events:
+                return self.events.popleft()
+            self._waker = (asyncio.get_running_loop(), event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self.ready:
+                self._waker = None
+        return self._pop()
+
+
+class Hub:
+    """Публикация событий в каналы и подписка на них."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self._lock:
+            for channel in channels:
+                self._subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel, set())
+                subscribers.discard(subscription)
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+    def publish(self, channel, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put((event, data))
+
+    def subscribers(self, channel):
+        with self._lock:
+            return len(self._subscribers.get(channel, ()))
+
+
+hub = Hub()
+
+
+def post_created(post):
+    data = {'id': post.pk, 'author': post.author_id}
+    hub.publish('index', 'post', data)
+    hub.publish(f'author:{post.author_id}', 'post', data)
+
+
+def comment_created(comment):
+    hub.publish(f'post:{comment.post_id}', 'comment',
+                {'id': comment.pk, 'post': comment.post_id})
+
+
+def _format(message):
+    event, data = message
+    return (f'event: {event}\n'
+            f'data: {json.dumps(data)}\n\n').encode()
+
+
+class EventStream:
+    """Тело ответа text/event-stream.
+
+    Синхронный итератор для WSGI и асинхронный для core.asgi.
+    Раз в LIVE_HEARTBEAT секунд без событий уходит комментарий,
+    чтобы прокси не рвали соединение; через LIVE_STREAM_TIMEOUT
+    поток заканчивается, и браузер переподключается сам.
+    """
+    def __init__(self, channels):
+        self.channels = channels
+
+    def _opening(self):
+        # через сколько миллисекунд браузеру переподключаться
+        return f'retry: {settings.LIVE_RETRY_MS}\n\n'.encode()
+
+    def __iter__(self):
+        subscription = hub.subscribe(self.channels)
+        deadline = time.monotonic() + settings.LIVE_STREAM_TIMEOUT
+        try:
+            yield self._opening()
+            while time.monotonic() < deadline:
+                message = subscription.get(settings.LIVE_HEARTBEAT)
+                yield b': ping\n\n' if message is None else _format(message)
+        finally:
+            hub.unsubscribe(subscription)
+
+    async def __aiter__(self):
+        subscription = hub.subscribe(self.channels)
+        deadline = time.monotonic() + settings.LIVE_STREAM_TIMEOUT
+        try:
+            yield self._opening()
+            while time.monotonic() < deadline:
+                message = await subscription.aget(settings.LIVE_HEARTBEAT)
+                yield b': ping\n\n' if message is None else _format(message)
+        finally:
+            hub.unsubscribe(subscription)
@@ -0,0 +1,175 @@
+import json
+import math
+import threading
+import time
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.routers import PRIMARY, replicas
+from posts import urls
+from posts.models import Comment, Group, Post, User
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(share * len(ordered)))
+    return ordered[rank - 1]
+
+
+def sample_kwargs():
+    """Аргументы URL: самые нагруженные группа, автор и пост."""
+    group = Group.objects.order_by().annotate(
+        total=Count('posts')).order_by('-total').first()
+    author = User.objects.order_by(
+        '-counters__posts_count', 'pk').first()
+    post = Post.objects.order_by('-comments_count', '-pk').first()
+    if None in (group, author, post):
+        raise CommandError('В базе нет данных, запустите seed_data')
+    return {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+        'feed_format': 'atom',
+    }
+
+
+def reader():
+    """Пользователь с самой длинной лентой подписок."""
+    return User.objects.order_by('-counters__following_count', 'pk').first()
+
+
+class WriteLoad:
+    """Потоки, непрерывно добавляющие комментарии, пока идут замеры."""
+    def __init__(self, writers, post_id, author_id):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.created = []
+        self.errors = 0
+        self.threads = [
+            threading.Thread(target=self.write, args=(post_id, author_id))
+            for _ in range(writers)]
+
+    def write(self, post_id, author_id):
+        try:
+            while not self.stop.is_set():
+                try:
+                    comment = Comment.objects.create(
+                        post_id=post_id, author_id=author_id,
+                        text='Нагрузочный комментарий')
+                except OperationalError:
+                    with self.lock:
+                        self.errors += 1
+                    continue
+                with self.lock:
+                    self.created.append(comment.pk)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop.set()
+        for thread in self.threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        for comment in Comment.objects.filter(pk__in=self.created):
+            comment.delete()
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет все адреса posts.urls через тестовый клиент '
+            'и выводит p50/p95 времени ответа, число запросов и объём')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20,
+                            help='Запросов к каждому адресу')
+        parser.add_argument('--cold', action='store_true',
+                            help='Очищать кэш перед каждым запросом')
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Запросы без авторизации')
+        parser.add_argument('--writers', type=int, default=0,
+                            help='Потоков, параллельно пишущих '
+                                 'комментарии (проверка блокировок)')
+        parser.add_argument('--json', metavar='PATH',
+                            help='Сохранить результаты в JSON для '
+                                 'сравнения сборок')
+
+    def handle(self, *args, **options):
+        kwargs = sample_kwargs()
+        client = Client()
+        if not options['anonymous']:
+            client.force_login(reader())
+        results = []
+        with WriteLoad(options['writers'], kwargs['post_id'],
+                       reader().pk) as load:
+            for pattern in urls.urlpatterns:
+                name = f'{urls.app_name}:{pattern.name}'
+                url = reverse(name, kwargs={
+                    key: kwargs[key] for key in pattern.pattern.converters})
+                results.append(self.measure(client, name, url, options))
+        self.stdout.write(
+            f'{"url":<28}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"запросов":>10}{"байт":>10}{"ошибок":>8}')
+        for result in results:
+            self.stdout.write(
+                f'{result["url"]:<28}{result["p50"]:>10.1f}'
+                f'{result["p95"]:>10.1f}{result["queries"]:>10}'
+                f'{result["bytes"]:>10}{result["errors"]:>8}')
+        if options['writers']:
+            self.stdout.write(
+                f'Запись: {len(load.created) / load.elapsed:.0f} '
+                f'комментариев/с, ошибок блокировки: {load.errors}')
+        if options['json']:
+            with open(options['json'], 'w') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+
+    def measure(self, client, name, url, options):
+        timings = []
+        queries = [0]
+        sizes = [0]
+        errors = 0
+        for _ in range(options['requests']):
+            if options['cold']:
+                cache.clear()
+            started = time.perf_counter()
+            # Адреса вроде подписки меняют данные: каждый запрос
+            # откатывается, чтобы замеры не влияли друг на друга
+            try:
+                with transaction.atomic(), ExitStack() as stack:
+                    # запросы считаются и по репликам
+                    captured = [
+                        stack.enter_context(
+                            CaptureQueriesContext(connections[alias]))
+                        for alias in (PRIMARY, *replicas())]
+                    response = client.get(url)
+                    transaction.set_rollback(True)
+            except OperationalError:
+                # база заблокирована параллельной записью (--writers)
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(sum(map(len, captured)))
+            # у потоков событий (posts.live) замеряется только ответ
+            # с заголовками, тело не читается
+            sizes.append(0 if response.streaming else len(response.content))
+            response.close()
+        return {
+            'url': name,
+            'p50': percentile(timings, 0.5) if timings else math.nan,
+            'p95': percentile(timings, 0.95) if timings else math.nan,
+            'queries': max(queries),
+            'bytes': max(sizes),
+            'errors': errors,
+        }
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import comment_queue
+
+
+class Command(BaseCommand):
+    help = 'Записывает комментарии из очереди в базу пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться')
+        parser.add_argument(
+            '--interval', type=float, default=0.5,
+            help='Пауза между опросами пустой очереди, секунд')
+
+    def handle(self, *args, **options):
+        if not comment_queue.enabled():
+            raise CommandError('Очередь выключена: задайте '
+                               'POSTS_COMMENT_QUEUE в настройках')
+        while True:
+            processed = comment_queue.flush()
+            if processed:
+                self.stdout.write(f'Разобрано комментариев: {processed}')
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,65 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post, TimelineEntry
+from posts.utils import COMMENTS_PAGE, TEN_PAGES, CursorPaginator
+
+FULL_SCAN = re.compile(r'(SCAN (TABLE )?\w+$|USE TEMP B-TREE)', re.M)
+
+
+def feed_querysets():
+    """Запросы лент в том виде, в каком их выполняют views."""
+    now = timezone.now()
+    posts = Post.objects.select_related('author', 'group')
+    feeds = {
+        'index': posts.all(),
+        'group_posts': posts.filter(group_id=0),
+        'profile': posts.filter(author_id=0),
+    }
+    querysets = {}
+    for name, queryset in feeds.items():
+        paginator = CursorPaginator(queryset, TEN_PAGES)
+        querysets[name] = paginator.object_list[:TEN_PAGES]
+        querysets[f'{name} (cursor)'] = paginator.object_list.filter(
+            paginator.after(now, 0))[:TEN_PAGES + 1]
+    timeline = TimelineEntry.objects.filter(
+        user_id=0).select_related('post__author', 'post__group')
+    paginator = CursorPaginator(timeline, TEN_PAGES, 'post_id')
+    querysets['follow_index'] = paginator.object_list[:TEN_PAGES]
+    querysets['follow_index (cursor)'] = paginator.object_list.filter(
+        paginator.after(now, 0))[:TEN_PAGES + 1]
+    querysets['profile following'] = Follow.objects.filter(
+        user_id=0, author_id=0)
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=0).select_related('author'),
+        COMMENTS_PAGE, date_field='created')
+    querysets['post_detail comments'] = paginator.object_list[
+        :COMMENTS_PAGE + 1]
+    querysets['post_detail comments (cursor)'] = paginator.object_list.filter(
+        paginator.after(now, 0))[:COMMENTS_PAGE + 1]
+    querysets['post fan-out'] = Follow.objects.filter(
+        author_id=0).values_list('user_id', flat=True)
+    return querysets
+
+
+class Command(BaseCommand):
+    help = 'Выводит EXPLAIN для запросов всех лент'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Ошибка, если запрос читает таблицу целиком или '
+                 'сортирует во временном B-дереве')
+
+    def handle(self, *args, **options):
+        slow = []
+        for name, queryset in feed_querysets().items():
+            plan = queryset.explain()
+            self.stdout.write(f'{name}:\n{plan}\n')
+            if FULL_SCAN.search(plan):
+                slow.append(name)
+        if slow and options['check']:
+            raise CommandError(
+                'Полный скан или сортировка: ' + ', '.join(slow))
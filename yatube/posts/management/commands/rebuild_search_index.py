@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.search import index_post
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс по всем постам'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.select_related('group')
+        total = 0
+        for post in posts.iterator():
+            index_post(post)
+            total += 1
+        self.stdout.write(f'Проиндексировано постов: {total}')
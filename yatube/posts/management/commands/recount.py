@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F
+
+from posts.models import Follow, Post, User, UserCounters
+
+BATCH_SIZE = 1000
+
+
+def _counts(queryset, field):
+    return dict(queryset.order_by().values(field).annotate(
+        total=Count('pk')).values_list(field, 'total'))
+
+
+def recount_posts():
+    """Чинит comments_count у постов, где он разошёлся с данными."""
+    drift = []
+    posts = Post.objects.order_by().annotate(
+        actual=Count('comments')).exclude(comments_count=F('actual'))
+    for post in posts.iterator():
+        post.comments_count = post.actual
+        drift.append(post)
+    Post.objects.bulk_update(drift, ['comments_count'],
+                             batch_size=BATCH_SIZE)
+    return len(drift)
+
+
+def recount_users():
+    """Создаёт недостающие счётчики пользователей и чинит остальные."""
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=user_id)
+         for user_id in User.objects.filter(
+             counters__isnull=True).values_list('pk', flat=True)],
+        batch_size=BATCH_SIZE)
+    actual = {
+        'posts_count': _counts(Post.objects, 'author'),
+        'followers_count': _counts(Follow.objects, 'author'),
+        'following_count': _counts(Follow.objects, 'user'),
+    }
+    drift = []
+    for counters in UserCounters.objects.iterator():
+        changed = False
+        for field, totals in actual.items():
+            value = totals.get(counters.user_id, 0)
+            if getattr(counters, field) != value:
+                setattr(counters, field, value)
+                changed = True
+        if changed:
+            drift.append(counters)
+    UserCounters.objects.bulk_update(drift, list(actual),
+                                     batch_size=BATCH_SIZE)
+    return len(drift)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок'
+
+    def handle(self, *args, **options):
+        posts = recount_posts()
+        users = recount_users()
+        self.stdout.write(
+            f'Исправлено постов: {posts}, пользователей: {users}')
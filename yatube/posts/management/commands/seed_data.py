@@ -0,0 +1,172 @@
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from faker import Faker
+
+from posts.management.commands.recount import recount_posts, recount_users
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+from posts.search import index_post
+from posts.signals import TIMELINE_BACKFILL
+from posts.utils import explicit_dates
+
+BATCH_SIZE = 1000
+# Пароль всех сгенерированных пользователей
+PASSWORD = 'yatube-password'
+# Из скольких заготовок собираются тексты постов и комментариев
+TEXT_POOL = 500
+
+
+def _batches(objects, model):
+    """bulk_create порциями по BATCH_SIZE; возвращает число строк."""
+    total = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+            batch = []
+    model.objects.bulk_create(batch, ignore_conflicts=True)
+    return total + len(batch)
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, группами, '
+            'постами, подписками и комментариями')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок на пользователя')
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределяются даты публикаций')
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Зерно генератора для воспроизводимых данных')
+        parser.add_argument(
+            '--skip-search', action='store_true',
+            help='Не строить поисковый индекс')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(options['seed'])
+        self.now = timezone.now()
+        self.days = options['days']
+        self.texts = [self.fake.paragraph(nb_sentences=3)
+                      for _ in range(TEXT_POOL)]
+
+        users = self.create_users(options['users'])
+        groups = self.create_groups(options['groups'])
+        # Популярность авторов распределена по Парето: немногие авторы
+        # пишут большую часть постов и собирают большинство подписчиков
+        weights = [self.random.paretovariate(1.2) for _ in users]
+        with explicit_dates(Post._meta.get_field('pub_date'),
+                            Comment._meta.get_field('created')):
+            posts = self.create_posts(options['posts'], users, groups,
+                                      weights)
+            self.create_comments(options['comments'], users, posts)
+        self.create_follows(options['follows'], users, weights)
+        self.fill_timeline()
+        recount_posts()
+        recount_users()
+        if not options['skip_search']:
+            for post in Post.objects.select_related('group').iterator():
+                index_post(post)
+        cache.clear()
+
+    def report(self, model, total):
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+
+    def random_date(self):
+        return self.now - timedelta(
+            seconds=self.random.uniform(0, self.days * 24 * 60 * 60))
+
+    def create_users(self, total):
+        offset = User.objects.count()
+        password = make_password(PASSWORD)
+        created = _batches(
+            (User(username=f'{self.fake.user_name()}{offset + number}',
+                  first_name=self.fake.first_name(),
+                  last_name=self.fake.last_name(),
+                  password=password)
+             for number in range(total)), User)
+        self.report(User, created)
+        return list(User.objects.values_list('pk', flat=True))
+
+    def create_groups(self, total):
+        offset = Group.objects.count()
+        created = _batches(
+            (Group(title=self.fake.catch_phrase()[:200],
+                   slug=f'group-{offset + number}',
+                   description=self.fake.paragraph())
+             for number in range(total)), Group)
+        self.report(Group, created)
+        return list(Group.objects.values_list('pk', flat=True))
+
+    def create_posts(self, total, users, groups, weights):
+        authors = self.random.choices(users, weights, k=total)
+        created = _batches(
+            (Post(author_id=author_id,
+                  group_id=(self.random.choice(groups)
+                            if groups and self.random.random() < 0.7
+                            else None),
+                  text=self.random.choice(self.texts),
+                  pub_date=self.random_date())
+             for author_id in authors), Post)
+        self.report(Post, created)
+        return list(Post.objects.values_list('pk', 'pub_date'))
+
+    def create_comments(self, total, users, posts):
+        if not posts:
+            return
+        created = _batches(
+            (Comment(post_id=post_id,
+                     author_id=self.random.choice(users),
+                     text=self.random.choice(self.texts),
+                     created=pub_date + (self.now - pub_date) * 0.5)
+             for post_id, pub_date in self.random.choices(posts, k=total)),
+            Comment)
+        self.report(Comment, created)
+
+    def create_follows(self, average, users, weights):
+        follows = set()
+        for user_id in users:
+            count = min(len(users) - 1,
+                        int(self.random.expovariate(1 / average))
+                        if average else 0)
+            for author_id in self.random.choices(users, weights, k=count):
+                if author_id != user_id:
+                    follows.add((user_id, author_id))
+        created = _batches(
+            (Follow(user_id=user_id, author_id=author_id)
+             for user_id, author_id in follows), Follow)
+        self.report(Follow, created)
+
+    def fill_timeline(self):
+        """Ленты подписок, как их собрали бы сигналы при подписке."""
+        recent = {}
+        posts = Post.objects.order_by(
+            'author_id', '-pub_date', '-pk'
+        ).values_list('author_id', 'pk', 'pub_date')
+        for author_id, post_id, pub_date in posts.iterator():
+            author_posts = recent.setdefault(author_id, [])
+            if len(author_posts) < TIMELINE_BACKFILL:
+                author_posts.append((post_id, pub_date))
+        follows = Follow.objects.values_list('user_id', 'author_id')
+        created = _batches(
+            (TimelineEntry(user_id=user_id, post_id=post_id,
+                           pub_date=pub_date)
+             for user_id, author_id in follows.iterator()
+             for post_id, pub_date in recent.get(author_id, ())),
+            TimelineEntry)
+        self.report(TimelineEntry, created)
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.thumbnails import pending_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Собирает миниатюры загруженных картинок из очереди заданий'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Разобрать очередь и завершиться')
+        parser.add_argument(
+            '--interval', type=float, default=2.0,
+            help='Пауза между опросами пустой очереди, секунд')
+
+    def handle(self, *args, **options):
+        while True:
+            job_ids = list(pending_jobs().values_list('pk', flat=True))
+            built = sum(run_job(job_id) for job_id in job_ids)
+            if built:
+                self.stdout.write(f'Собрано миниатюр: {built}')
+            if options['once']:
+                return
+            if not job_ids:
+                time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+
+def fill_images(apps, schema_editor):
+    # незавершённые задания относятся к текущей картинке поста
+    ThumbnailJob = apps.get_model('posts', 'ThumbnailJob')
+    for job in ThumbnailJob.objects.filter(
+            finished__isnull=True).select_related('post'):
+        job.image = job.post.image.name or ''
+        job.save(update_fields=['image'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='image',
+            field=models.CharField(blank=True, max_length=255, verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_images, migrations.RunPython.noop),
+    ]
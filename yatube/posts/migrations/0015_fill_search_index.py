@@ -0,0 +1,53 @@
+from collections import Counter, defaultdict
+
+from django.db import migrations
+
+from posts.search import (COMMENT_WEIGHT, GROUP_DESCRIPTION_WEIGHT,
+                          GROUP_TITLE_WEIGHT, TEXT_WEIGHT, tokenize)
+
+BATCH = 500
+
+
+def fill_search_index(apps, schema_editor):
+    # 0013 создала пустой индекс: без него существующие посты не
+    # находились бы ни на /search/, ни в поиске админки
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    SearchEntry = apps.get_model('posts', 'SearchEntry')
+    post_ids = list(Post.objects.filter(
+        search_entries__isnull=True).values_list('pk', flat=True))
+    for start in range(0, len(post_ids), BATCH):
+        batch = post_ids[start:start + BATCH]
+        comments = defaultdict(list)
+        for post_id, text in Comment.objects.filter(
+                post_id__in=batch).values_list('post_id', 'text'):
+            comments[post_id].append(text)
+        entries = []
+        for post in Post.objects.filter(pk__in=batch).select_related(
+                'group'):
+            weights = Counter()
+            for term in tokenize(post.text):
+                weights[term] += TEXT_WEIGHT
+            if post.group_id is not None:
+                for term in tokenize(post.group.title):
+                    weights[term] += GROUP_TITLE_WEIGHT
+                for term in tokenize(post.group.description):
+                    weights[term] += GROUP_DESCRIPTION_WEIGHT
+            for text in comments[post.pk]:
+                for term in tokenize(text):
+                    weights[term] += COMMENT_WEIGHT
+            entries.extend(
+                SearchEntry(term=term, post_id=post.pk, weight=weight)
+                for term, weight in weights.items())
+        SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_thumbnail_job_image'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
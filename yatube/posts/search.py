@@ -0,0 +1,107 @@
+import re
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import Comment, Post, SearchEntry
+
+TERM_RE = re.compile(r'\w{2,}')
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 10
+# Вес совпадения в зависимости от поля, где найдено слово
+TEXT_WEIGHT = 4
+GROUP_TITLE_WEIGHT = 3
+GROUP_DESCRIPTION_WEIGHT = 1
+COMMENT_WEIGHT = 1
+
+
+def tokenize(text):
+    """Нормализованные слова текста: нижний регистр, ё → е."""
+    text = text.lower().replace('ё', 'е')
+    return [term[:MAX_TERM_LENGTH] for term in TERM_RE.findall(text)]
+
+
+def post_terms(post):
+    """Веса слов поста с учётом группы и комментариев."""
+    weights = Counter()
+    for term in tokenize(post.text):
+        weights[term] += TEXT_WEIGHT
+    if post.group_id is not None:
+        for term in tokenize(post.group.title):
+            weights[term] += GROUP_TITLE_WEIGHT
+        for term in tokenize(post.group.description):
+            weights[term] += GROUP_DESCRIPTION_WEIGHT
+    comments = Comment.objects.filter(post=post).values_list(
+        'text', flat=True)
+    for text in comments:
+        weights.update(comment_terms(text))
+    return weights
+
+
+def comment_terms(text):
+    """Веса слов одного комментария."""
+    weights = Counter()
+    for term in tokenize(text):
+        weights[term] += COMMENT_WEIGHT
+    return weights
+
+
+def index_post(post):
+    """Перестраивает записи индекса одного поста."""
+    entries = [SearchEntry(term=term, post=post, weight=weight)
+               for term, weight in post_terms(post).items()]
+    # удаление и вставка в одной транзакции: параллельная
+    # переиндексация того же поста не столкнётся на unique
+    with transaction.atomic():
+        SearchEntry.objects.filter(post=post).delete()
+        SearchEntry.objects.bulk_create(entries)
+
+
+def add_comment_terms(comment):
+    """Добавляет к индексу поста слова нового комментария.
+
+    Обновляются только записи слов комментария, а не весь пост.
+    Если ту же новую запись параллельно вставил другой процесс,
+    пост переиндексируется целиком.
+    """
+    entries = []
+    try:
+        with transaction.atomic():
+            for term, weight in comment_terms(comment.text).items():
+                updated = SearchEntry.objects.filter(
+                    post_id=comment.post_id, term=term
+                ).update(weight=F('weight') + weight)
+                if not updated:
+                    entries.append(SearchEntry(
+                        term=term, post_id=comment.post_id, weight=weight))
+            SearchEntry.objects.bulk_create(entries)
+    except IntegrityError:
+        post = Post.objects.filter(
+            pk=comment.post_id).select_related('group').first()
+        if post is not None:
+            index_post(post)
+
+
+def remove_comment_terms(comment):
+    """Вычитает из индекса поста слова удалённого комментария."""
+    with transaction.atomic():
+        for term, weight in comment_terms(comment.text).items():
+            entries = SearchEntry.objects.filter(
+                post_id=comment.post_id, term=term)
+            entries.filter(weight__lte=weight).delete()
+            entries.filter(weight__gt=weight).update(
+                weight=F('weight') - weight)
+
+
+def search_posts(query):
+    """Посты, содержащие все слова запроса, по убыванию релевантности."""
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return Post.objects.none()
+    return Post.objects.filter(
+        search_entries__term__in=terms
+    ).annotate(
+        rank=Sum('search_entries__weight'),
+        matched=Count('search_entries'),
+    ).filter(matched=len(terms)).order_by('-rank', '-pub_date', '-pk')
@@ -0,0 +1,322 @@
+from django.db.models import F
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import live
+from .caching import bump_feeds, bump_post_feeds, feed_key, public_feeds
+from .thumbnails import enqueue
+from .models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                     UserCounters)
+from .search import add_comment_terms, index_post, remove_comment_terms
+from .syndication import render_snapshots
+
+TIMELINE_BACKFILL = 1000
+# Поля поста, которые видны в RSS и Atom лентах
+SYNDICATED_FIELDS = {'text', 'group', 'pub_date'}
+# Поля автора, которые видны в карточке поста
+USER_CARD_FIELDS = ('username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    """Новый пост сразу попадает в ленты всех подписчиков автора."""
+    if not created or raw:
+        return
+    followers = Follow.objects.filter(
+        author_id=instance.author_id).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id,
+                       post=instance,
+                       pub_date=instance.pub_date)
+         for user_id in followers],
+        ignore_conflicts=True)
+
+
+@receiver(post_save, sender=Post)
+def publish_post(sender, instance, created, raw=False, **kwargs):
+    """Живые ленты узнают о посте после коммита, когда его уже видно."""
+    if created and not raw:
+        transaction.on_commit(lambda: live.post_created(instance))
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: live.comment_created(instance))
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    """При подписке в ленту добавляются последние посты автора."""
+    if not created or raw:
+        return
+    posts = Post.objects.filter(
+        author_id=instance.author_id
+    ).values_list('pk', 'pub_date')[:TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=instance.user_id,
+                       post_id=post_id,
+                       pub_date=pub_date)
+         for post_id, pub_date in posts],
+        ignore_conflicts=True)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    """При отписке посты автора убираются из ленты."""
+    TimelineEntry.objects.filter(
+        user_id=instance.user_id,
+        post__author_id=instance.author_id).delete()
+
+
+def _bump(user_id, **deltas):
+    """Сдвигает счётчики пользователя; ниже нуля не опускает."""
+    floor = {f'{field}__gt': 0
+             for field, delta in deltas.items() if delta < 0}
+    updated = UserCounters.objects.filter(user_id=user_id, **floor).update(
+        **{field: F(field) + delta for field, delta in deltas.items()})
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        UserCounters.objects.get_or_create(user_id=user_id)
+        _bump(user_id, **deltas)
+
+
+@receiver(post_save, sender=User)
+def create_counters(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _bump(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def uncount_post(sender, instance, **kwargs):
+    _bump(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_comment(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id, comments_count__gt=0).update(
+        comments_count=F('comments_count') - 1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        _bump(instance.author_id, followers_count=1)
+        _bump(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def uncount_follow(sender, instance, **kwargs):
+    _bump(instance.author_id, followers_count=-1)
+    _bump(instance.user_id, following_count=-1)
+
+
+@receiver(pre_save, sender=Post)
+def prepare_post_update(sender, instance, raw=False, **kwargs):
+    """Запоминает прежнюю группу и меняет версию карточки поста."""
+    if instance.pk is not None and not raw:
+        instance.version += 1
+        instance._previous_group_slug = Post.objects.filter(
+            pk=instance.pk).values_list('group__slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_feeds(sender, instance, raw=False, **kwargs):
+    """Сбрасывает все ленты, в которых показывается пост."""
+    if not raw:
+        bump_post_feeds(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def render_syndication(sender, instance, raw=False, update_fields=None,
+                       **kwargs):
+    """Перерисовывает RSS и Atom ленты с постом."""
+    if raw or (update_fields
+               and not SYNDICATED_FIELDS & set(update_fields)):
+        return
+    for feed in public_feeds(instance):
+        render_snapshots(*feed)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_feeds(sender, instance, raw=False, **kwargs):
+    """Подписка меняет ленту подписчика и счётчики обоих профилей."""
+    if raw:
+        return
+    bump_feeds(
+        feed_key('follow', instance.user_id),
+        feed_key('profile', instance.author.username),
+        feed_key('profile', instance.user.username))
+
+
+@receiver(post_save, sender=Post)
+def enqueue_thumbnails(sender, instance, raw=False, **kwargs):
+    """Картинка без миниатюр отправляется в фоновую сборку."""
+    if not raw and instance.image and not instance.thumbnail_ready:
+        enqueue(instance)
+
+
+def _reindex(post_ids):
+    for post in Post.objects.filter(
+            pk__in=post_ids).select_related('group'):
+        index_post(post)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw=False, update_fields=None,
+                     **kwargs):
+    """Переиндексирует пост, если изменились текст или группа."""
+    if raw or (update_fields and not {'text', 'group'} & update_fields):
+        return
+    index_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def index_commented_post(sender, instance, created, raw=False, **kwargs):
+    """Новый комментарий добавляет в индекс только свои слова."""
+    if raw:
+        return
+    if created:
+        add_comment_terms(instance)
+    else:
+        # прежний текст неизвестен: пост переиндексируется целиком
+        _reindex([instance.post_id])
+
+
+@receiver(post_delete, sender=Comment)
+def index_uncommented_post(sender, instance, **kwargs):
+    # вместе с постом удаляются и его записи индекса, так что
+    # вычитание из них безопасно и при каскадном удалении
+    remove_comment_terms(instance)
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_text(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние название, описание и адрес группы."""
+    if instance.pk is not None and not raw:
+        previous = Group.objects.filter(pk=instance.pk).values_list(
+            'title', 'description', 'slug').first()
+        if previous is not None:
+            instance._previous_text = previous[:2]
+            instance._previous_slug = previous[2]
+
+
+@receiver(post_save, sender=Group)
+def index_group_posts(sender, instance, created, raw=False, **kwargs):
+    """Посты группы переиндексируются, только если изменился её текст."""
+    if created or raw:
+        return
+    if getattr(instance, '_previous_text', None) == (
+            instance.title, instance.description):
+        return
+    _reindex(instance.posts.values_list('pk', flat=True))
+
+
+def _refresh_cards(posts, *feeds):
+    """Меняет версию карточек постов и сбрасывает ленты с ними.
+
+    feeds — ленты по прежнему адресу группы или имени автора.
+    """
+    posts = posts.order_by()
+    posts.update(version=F('version') + 1)
+    keys = {feed_key('index'), *(feed_key(*feed) for feed in feeds)}
+    for author_id, username, slug in posts.values_list(
+            'author_id', 'author__username', 'group__slug').distinct():
+        keys.update((feed_key('author', author_id),
+                     feed_key('profile', username)))
+        if slug is not None:
+            keys.add(feed_key('group', slug))
+    bump_feeds(*keys)
+
+
+@receiver(post_save, sender=Group)
+def refresh_group_cards(sender, instance, created, raw=False, **kwargs):
+    """В карточках постов видны название и адрес группы."""
+    if created or raw:
+        return
+    previous_title = getattr(instance, '_previous_text', (None,))[0]
+    previous_slug = getattr(instance, '_previous_slug', instance.slug)
+    if (previous_title, previous_slug) == (instance.title, instance.slug):
+        return
+    _refresh_cards(instance.posts.all(), ('group', previous_slug))
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    instance._post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def index_ungrouped_posts(sender, instance, **kwargs):
+    _reindex(getattr(instance, '_post_ids', []))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def render_group_syndication(sender, instance, raw=False, **kwargs):
+    """Заголовок ленты группы берётся из группы; удалённая — без ленты."""
+    if raw:
+        return
+    render_snapshots('group', instance.slug)
+    previous_slug = getattr(instance, '_previous_slug', instance.slug)
+    if previous_slug != instance.slug:
+        # группы по старому адресу нет: её снимки удаляются
+        render_snapshots('group', previous_slug)
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance, raw=False, update_fields=None,
+                        **kwargs):
+    """Запоминает прежние имя пользователя и полное имя."""
+    # вход пользователя сохраняет только last_login
+    if update_fields and set(update_fields).isdisjoint(USER_CARD_FIELDS):
+        return
+    if instance.pk is not None and not raw:
+        previous = User.objects.filter(pk=instance.pk).values_list(
+            *USER_CARD_FIELDS).first()
+        if previous is not None:
+            instance._previous_names = previous
+            instance._previous_username = previous[0]
+
+
+@receiver(post_save, sender=User)
+def drop_renamed_profile_syndication(sender, instance, raw=False,
+                                     **kwargs):
+    """Снимки ленты по старому имени пользователя удаляются."""
+    previous = getattr(instance, '_previous_username', None)
+    if not raw and previous and previous != instance.username:
+        render_snapshots('profile', previous)
+
+
+@receiver(post_save, sender=User)
+def refresh_author_cards(sender, instance, created, raw=False, **kwargs):
+    """В карточках постов видны имя и полное имя автора."""
+    previous = getattr(instance, '_previous_names', None)
+    if created or raw or previous is None:
+        return
+    if previous == tuple(getattr(instance, field)
+                         for field in USER_CARD_FIELDS):
+        return
+    _refresh_cards(instance.posts.all(), ('profile', previous[0]))
+
+
+@receiver(post_delete, sender=User)
+def drop_profile_syndication(sender, instance, **kwargs):
+    render_snapshots('profile', instance.username)
@@ -0,0 +1,115 @@
+"""RSS и Atom ленты.
+
+Лента рендерится один раз при изменении постов (см. signals.py)
+и хранится в кэше готовым XML вместе с ETag и Last-Modified,
+так что опрос ленты читалкой стоит одного обращения к кэшу.
+Снимки живут POSTS_FEED_SNAPSHOT_TIMEOUT секунд: ленты, до которых
+не дошла очистка, со временем вытесняются.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+
+from .caching import feed_key
+from .models import Group, Post, User
+
+FEED_FORMATS = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+}
+FEED_ITEMS = 20
+SNAPSHOT_PREFIX = 'syndication'
+
+
+def _absolute(path):
+    return settings.POSTS_FEED_BASE_URL.rstrip('/') + path
+
+
+def _snapshot_key(feed_format, name, *parts):
+    return f'{SNAPSHOT_PREFIX}:{feed_format}:{feed_key(name, *parts)}'
+
+
+def _feed_source(name, *parts):
+    """Заголовок, ссылка и посты ленты; None, если ленты нет."""
+    if name == 'index':
+        return ('Последние обновления на сайте',
+                reverse('posts:index'),
+                Post.objects.all())
+    if name == 'group':
+        group = Group.objects.filter(slug=parts[0]).first()
+        if group is None:
+            return None
+        return (f'Записи сообщества {group.title}',
+                reverse('posts:group_list', args=parts),
+                group.posts.all())
+    if name == 'profile':
+        author = User.objects.filter(username=parts[0]).first()
+        if author is None:
+            return None
+        return (f'Все посты пользователя {author.username}',
+                reverse('posts:profile', args=parts),
+                author.posts.all())
+    raise ValueError(f'Неизвестная лента: {name}')
+
+
+def render_snapshots(name, *parts):
+    """Рендерит ленту во всех форматах и сохраняет в кэш.
+
+    Возвращает словарь формат -> снимок или None, если группы
+    или автора больше нет; устаревшие снимки при этом удаляются.
+    """
+    keys = {feed_format: _snapshot_key(feed_format, name, *parts)
+            for feed_format in FEED_FORMATS}
+    source = _feed_source(name, *parts)
+    if source is None:
+        cache.delete_many(keys.values())
+        return None
+    title, link, posts = source
+    posts = list(posts.select_related('author', 'group').order_by(
+        '-pub_date', '-pk')[:FEED_ITEMS])
+    rendered = timezone.now().replace(microsecond=0)
+    snapshots = {}
+    for feed_format, feed_class in FEED_FORMATS.items():
+        feed = feed_class(
+            title=title,
+            link=_absolute(link),
+            description=title,
+            language='ru',
+            feed_url=_absolute(reverse(
+                f'posts:{name}_feed', args=(*parts, feed_format))),
+        )
+        for post in posts:
+            url = _absolute(reverse('posts:post_detail', args=(post.pk,)))
+            feed.add_item(
+                title=str(post),
+                link=url,
+                description=post.text,
+                unique_id=url,
+                author_name=post.author.username,
+                pubdate=post.pub_date,
+                categories=[post.group.title] if post.group else None,
+            )
+        body = feed.writeString('utf-8').encode()
+        snapshots[feed_format] = {
+            'body': body,
+            'content_type': feed.content_type,
+            'etag': '"%s"' % hashlib.md5(body).hexdigest(),
+            'last_modified': rendered,
+        }
+    cache.set_many({keys[feed_format]: snapshot
+                    for feed_format, snapshot in snapshots.items()},
+                   settings.POSTS_FEED_SNAPSHOT_TIMEOUT)
+    return snapshots
+
+
+def get_snapshot(feed_format, name, *parts):
+    """Готовый снимок ленты; при промахе кэша лента рендерится."""
+    snapshot = cache.get(_snapshot_key(feed_format, name, *parts))
+    if snapshot is not None:
+        return snapshot
+    snapshots = render_snapshots(name, *parts)
+    return snapshots and snapshots[feed_format]
@@ -0,0 +1,36 @@
+from django import template
+from sorl.thumbnail import get_thumbnail
+
+from ..thumbnails import (CARD_WIDTH, RESPONSIVE_WIDTHS, card_variant,
+                          modern_formats)
+
+register = template.Library()
+
+CARD_SIZES = f'(max-width: {CARD_WIDTH}px) 100vw, {CARD_WIDTH}px'
+
+
+def _srcset(image, image_format):
+    thumbnails = []
+    for width in RESPONSIVE_WIDTHS:
+        geometry, options = card_variant(width, image_format)
+        thumbnail = get_thumbnail(image, geometry, **options)
+        thumbnails.append(f'{thumbnail.url} {width}w')
+    return ', '.join(thumbnails)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def picture(image, css='card-img my-2'):
+    """Картинка поста в нескольких ширинах и форматах.
+
+    Браузер сам выбирает по srcset вариант под ширину экрана
+    и первый поддерживаемый формат из <source>.
+    """
+    geometry, options = card_variant(CARD_WIDTH)
+    return {
+        'sources': [{'type': mime, 'srcset': _srcset(image, image_format)}
+                    for image_format, mime in modern_formats()],
+        'srcset': _srcset(image, 'JPEG'),
+        'src': get_thumbnail(image, geometry, **options).url,
+        'sizes': CARD_SIZES,
+        'css': css,
+    }
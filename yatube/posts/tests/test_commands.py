@@ -0,0 +1,88 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..management.commands.recount import recount_posts, recount_users
+from ..models import (Comment, Follow, Group, Post, SearchEntry,
+                      TimelineEntry, User, UserCounters)
+from ..search import post_terms
+
+
+class ExplainFeedsTest(TestCase):
+    def test_feeds_use_indexes(self):
+        """Ни один запрос ленты не читает таблицу целиком."""
+        out = StringIO()
+        call_command('explain_feeds', '--check', stdout=out)
+        self.assertIn('follow_index', out.getvalue())
+
+
+class RecountTest(TestCase):
+    def test_recount_repairs_drift(self):
+        """recount восстанавливает разошедшиеся счётчики."""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Текст')
+        Comment.objects.create(post=post, author=author, text='Текст')
+        Post.objects.update(comments_count=5)
+        UserCounters.objects.all().delete()
+        call_command('recount', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            UserCounters.objects.get(user=author).posts_count, 1)
+
+
+class FillSearchIndexTest(TestCase):
+    def test_migration_indexes_existing_posts(self):
+        """Миграция индексирует посты так же, как сигналы."""
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(title='Ёлки', slug='elki',
+                                     description='Про лес')
+        post = Post.objects.create(author=author, group=group,
+                                   text='Зелёная ёлка')
+        Comment.objects.create(post=post, author=author, text='Ёлка!')
+        Post.objects.create(author=author, text='Без группы')
+        SearchEntry.objects.all().delete()
+        migration = import_module('posts.migrations.0015_fill_search_index')
+        migration.fill_search_index(apps, None)
+        self.assertEqual(
+            dict(post.search_entries.values_list('term', 'weight')),
+            dict(post_terms(post)))
+        self.assertEqual(
+            SearchEntry.objects.values('post').distinct().count(), 2)
+
+
+class SeedDataTest(TestCase):
+    def test_seed_data_is_consistent(self):
+        """Сгенерированные данные согласованы с денормализацией."""
+        call_command('seed_data', users=20, groups=3, posts=100,
+                     follows=3, comments=50, seed=1, stdout=StringIO())
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(recount_posts(), 0)
+        self.assertEqual(recount_users(), 0)
+        self.assertTrue(SearchEntry.objects.exists())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user,
+                                         post__author=follow.author).count(),
+            follow.author.posts.count())
+        self.assertGreater(
+            Post.objects.dates('pub_date', 'day').count(), 1)
+
+
+class BenchmarkTest(TestCase):
+    def test_benchmark_reports_every_url(self):
+        """Отчёт содержит каждый адрес posts.urls."""
+        call_command('seed_data', users=5, groups=2, posts=20,
+                     follows=2, comments=10, seed=1, skip_search=True,
+                     stdout=StringIO())
+        follows = Follow.objects.count()
+        out = StringIO()
+        call_command('benchmark', requests=2, stdout=out)
+        for name in ('posts:index', 'posts:follow_index',
+                     'posts:post_detail', 'posts:group_feed'):
+            self.assertIn(name, out.getvalue())
+        self.assertEqual(Follow.objects.count(), follows)
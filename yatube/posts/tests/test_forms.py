@@ -1,13 +1,21 @@
+import os
 import shutil
+from io import BytesIO, StringIO
 import tempfile
+from unittest import mock
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from http import HTTPStatus
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image, PngImagePlugin
 
-from ..models import Group, Post, Comment, User
+from ..models import Group, Post, Comment, ThumbnailJob, User
 from ..forms import PostForm
+from ..search import search_posts
+from ..thumbnails import MAX_ATTEMPTS, run_job
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -97,6 +105,126 @@ class PostFormTests(TestCase):
                          'Поcт не добавлен в базу')
         self.assertFalse(new_posts.image is None)
 
+    def test_thumbnails_built_in_background(self):
+        """Миниатюры новой картинки собирает воркер, до этого
+        показывается заглушка."""
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=(
+                b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                b'\x0A\x00\x3B'),
+            content_type='image/gif')
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': uploaded})
+        post = Post.objects.latest('id')
+        self.assertFalse(post.thumbnail_ready)
+        self.assertTrue(ThumbnailJob.objects.filter(
+            post=post, finished__isnull=True).exists())
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertContains(response, 'Картинка обрабатывается')
+        call_command('thumbnail_worker', '--once', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_ready)
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertNotContains(response, 'Картинка обрабатывается')
+        self.assertContains(response, '<picture>')
+        self.assertContains(response, '480w')
+
+    def create_image_post(self, name):
+        """Пост с новой картинкой, ожидающей миниатюр."""
+        return Post.objects.create(
+            text='Пост с картинкой', author=self.user,
+            thumbnail_ready=False,
+            image=SimpleUploadedFile(name, b'GIF89a', 'image/gif'))
+
+    @mock.patch('posts.thumbnails.get_thumbnail')
+    def test_replaced_image_not_marked_ready(self, get_thumbnail):
+        """Задание для заменённой картинки не помечает пост готовым."""
+        post = self.create_image_post('old.gif')
+        old_job = ThumbnailJob.objects.get(post=post)
+        post.image = SimpleUploadedFile('new.gif', b'GIF89a', 'image/gif')
+        post.save()
+        new_job = ThumbnailJob.objects.exclude(pk=old_job.pk).get(post=post)
+        self.assertNotEqual(old_job.image, new_job.image)
+        self.assertFalse(run_job(old_job.pk))
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail_ready)
+        self.assertTrue(run_job(new_job.pk))
+        post.refresh_from_db()
+        self.assertTrue(post.thumbnail_ready)
+
+    @mock.patch('posts.thumbnails.get_thumbnail', side_effect=OSError)
+    def test_failed_thumbnails_keep_placeholder(self, get_thumbnail):
+        """После всех попыток пост остаётся с заглушкой."""
+        post = self.create_image_post('broken.gif')
+        job = ThumbnailJob.objects.get(post=post)
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            for _ in range(MAX_ATTEMPTS):
+                self.assertFalse(run_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, MAX_ATTEMPTS)
+        self.assertIsNotNone(job.finished)
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnail_ready)
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=100)
+    def test_image_normalized_on_upload(self):
+        """Картинка уменьшается и теряет EXIF при загрузке."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera'
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(
+            buffer, format='JPEG', exif=exif.tobytes())
+        form = PostForm(
+            data={'text': 'Тестовый текст'},
+            files={'image': SimpleUploadedFile(
+                'photo.jpg', buffer.getvalue(), 'image/jpeg')})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.size, (100, 50))
+        self.assertNotIn('exif', image.info)
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=100)
+    def test_png_metadata_stripped(self):
+        """PNG теряет EXIF и текстовые блоки, но не прозрачность."""
+        exif = Image.Exif()
+        exif[0x010F] = 'SecretCam'
+        text = PngImagePlugin.PngInfo()
+        text.add_text('Comment', 'секрет')
+        buffer = BytesIO()
+        Image.new('P', (400, 200)).save(
+            buffer, format='PNG', exif=exif.tobytes(), pnginfo=text,
+            transparency=0)
+        form = PostForm(
+            data={'text': 'Тестовый текст'},
+            files={'image': SimpleUploadedFile(
+                'picture.png', buffer.getvalue(), 'image/png')})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.size, (100, 50))
+        self.assertEqual(dict(image.getexif()), {})
+        self.assertNotIn('Comment', image.info)
+        self.assertIn('transparency', image.info)
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_image_too_many_pixels(self):
+        """Картинка с огромным разрешением отклоняется."""
+        buffer = BytesIO()
+        Image.new('RGB', (20, 20)).save(buffer, format='PNG')
+        form = PostForm(
+            data={'text': 'Тестовый текст'},
+            files={'image': SimpleUploadedFile(
+                'big.png', buffer.getvalue(), 'image/png')})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
     def test_edit_post(self):
         """Тестирование редактирование поста."""
         form_data = {'text': 'Тестовый текст',
@@ -131,3 +259,68 @@ class PostFormTests(TestCase):
         self.assertContains(response, 'Текст комментария')
         self.assertEqual(form_data['text'], new_comment.text)
         self.assertEqual(Comment.objects.count(), comment_count)
+
+
+class CommentQueueTests(TestCase):
+    """Отложенная запись комментариев через очередь."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.queue = tempfile.mkdtemp()
+        cls.user = User.objects.create_user(username='test_auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Тестовый текст',
+                                       author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.queue, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.url = reverse('posts:post_detail', args=(self.post.id,))
+
+    def test_comment_queued_then_flushed(self):
+        """Автор сразу видит комментарий, в базу он попадает пачкой."""
+        with override_settings(POSTS_COMMENT_QUEUE=self.queue):
+            etag = self.authorized_client.get(self.url)['ETag']
+            for text in ('Первый', 'Второй'):
+                self.authorized_client.post(
+                    reverse('posts:add_comment', args=(self.post.id,)),
+                    data={'text': f'{text} комментарий'})
+            self.assertFalse(Comment.objects.exists())
+            response = self.authorized_client.get(
+                self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertContains(response, 'Второй комментарий')
+            reader = Client()
+            reader.force_login(self.reader)
+            self.assertNotContains(reader.get(self.url),
+                                   'Второй комментарий')
+            call_command('comment_worker', '--once', stdout=StringIO())
+        self.assertEqual(Comment.objects.count(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 2)
+        self.assertEqual(list(search_posts('первый')), [self.post])
+        response = self.authorized_client.get(self.url)
+        self.assertNotContains(response, 'скоро появится')
+        self.assertContains(response, 'Первый комментарий')
+
+    def test_queue_rejects_missing_post_and_cleans_up(self):
+        """Комментарий к несуществующему посту не ставится в очередь,
+        пустые каталоги постов удаляются после записи."""
+        with override_settings(POSTS_COMMENT_QUEUE=self.queue):
+            response = self.authorized_client.post(
+                reverse('posts:add_comment', args=(self.post.id + 100,)),
+                data={'text': 'Комментарий в никуда'})
+            self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+            self.assertEqual(os.listdir(self.queue), [])
+            self.authorized_client.post(
+                reverse('posts:add_comment', args=(self.post.id,)),
+                data={'text': 'Комментарий'})
+            self.assertEqual(os.listdir(self.queue), [str(self.post.id)])
+            call_command('comment_worker', '--once', stdout=StringIO())
+            self.assertEqual(os.listdir(self.queue), [])
+        self.assertEqual(Comment.objects.count(), 1)
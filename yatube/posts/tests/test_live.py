@@ -0,0 +1,200 @@
+import asyncio
+import threading
+
+from django.core.cache import cache
+from django.test import (SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from yatube.asgi import application
+from ..live import hub
+from ..models import Comment, Follow, Post, User
+from ..utils import TEN_PAGES
+
+
+class HubTest(SimpleTestCase):
+    def test_publish_to_subscribed_channels(self):
+        subscription = hub.subscribe(['index', 'author:1'])
+        try:
+            hub.publish('author:1', 'post', {'id': 1})
+            hub.publish('author:2', 'post', {'id': 2})
+            self.assertEqual(subscription.get(0), ('post', {'id': 1}))
+            self.assertIsNone(subscription.get(0))
+        finally:
+            hub.unsubscribe(subscription)
+        self.assertEqual(hub.subscribers('index'), 0)
+
+    def test_async_wait_woken_from_thread(self):
+        """Корутина просыпается от публикации из другого потока."""
+        subscription = hub.subscribe(['index'])
+
+        async def wait():
+            threading.Timer(
+                0.05, hub.publish, ('index', 'post', {'id': 1})).start()
+            return await subscription.aget(5)
+
+        try:
+            self.assertEqual(asyncio.run(wait()), ('post', {'id': 1}))
+        finally:
+            hub.unsubscribe(subscription)
+
+
+class LiveDisabledTest(TestCase):
+    """По умолчанию (WSGI) страницы не открывают потоков событий."""
+    def setUp(self):
+        cache.clear()
+
+    def test_no_streams_without_setting(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(text='Пост', author=author)
+        pages = (reverse('posts:index'),
+                 reverse('posts:post_detail', args=[post.pk]))
+        for url in pages:
+            with self.subTest(url=url):
+                self.assertNotContains(self.client.get(url), 'EventSource')
+        streams = (reverse('posts:index_live'),
+                   reverse('posts:follow_live'),
+                   reverse('posts:post_live', args=[post.pk]))
+        for url in streams:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(LIVE_UPDATES=True, LIVE_HEARTBEAT=0.01,
+                   LIVE_STREAM_TIMEOUT=5)
+class LiveViewsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='author')
+        self.other = User.objects.create_user(username='other')
+        self.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.post = Post.objects.create(text='Старый пост',
+                                        author=self.author)
+
+    def next_event(self, stream):
+        """Следующее событие потока, пропуская пустые комментарии."""
+        for chunk in stream:
+            if not chunk.startswith(b':'):
+                return chunk.decode()
+
+    def test_index_stream_and_delta(self):
+        """Событие о новом посте и догрузка только нового поста."""
+        since = self.client.get(reverse('posts:index')).context['live_since']
+        response = self.client.get(reverse('posts:index_live'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = iter(response.streaming_content)
+        self.assertTrue(self.next_event(stream).startswith('retry:'))
+        post = Post.objects.create(text='Новый пост', author=self.other)
+        self.assertEqual(self.next_event(stream),
+                         f'event: post\ndata: {{"id": {post.pk}, '
+                         f'"author": {self.other.pk}}}\n\n')
+        response.close()
+        self.assertEqual(hub.subscribers('index'), 0)
+
+        delta = self.client.get(reverse('posts:index_new'),
+                                {'since': since}).json()
+        self.assertFalse(delta['reload'])
+        self.assertIn('Новый пост', delta['html'])
+        self.assertNotIn('Старый пост', delta['html'])
+        delta = self.client.get(reverse('posts:index_new'),
+                                {'since': delta['since']}).json()
+        self.assertEqual(delta['html'].strip(), '')
+
+    def test_reload_when_delta_too_big(self):
+        since = self.client.get(reverse('posts:index')).context['live_since']
+        for _ in range(TEN_PAGES + 1):
+            Post.objects.create(text='Пост', author=self.other)
+        for token in (since, 'испорчен', ''):
+            delta = self.client.get(reverse('posts:index_new'),
+                                    {'since': token}).json()
+            self.assertTrue(delta['reload'])
+
+    def test_follow_stream_only_followed_authors(self):
+        self.assertEqual(
+            self.client.get(reverse('posts:follow_live')).status_code, 403)
+        self.client.force_login(self.reader)
+        since = self.client.get(
+            reverse('posts:follow_index')).context['live_since']
+        stream = iter(self.client.get(
+            reverse('posts:follow_live')).streaming_content)
+        self.next_event(stream)
+        Post.objects.create(text='Чужой пост', author=self.other)
+        post = Post.objects.create(text='Пост автора', author=self.author)
+        self.assertIn(f'"id": {post.pk}', self.next_event(stream))
+        delta = self.client.get(reverse('posts:follow_new'),
+                                {'since': since}).json()
+        self.assertIn('Пост автора', delta['html'])
+        self.assertNotIn('Чужой пост', delta['html'])
+
+    def test_comment_stream_and_delta(self):
+        """Первому комментарию к посту тоже есть откуда догрузиться."""
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        since = self.client.get(url).context['live_since']
+        stream = iter(self.client.get(
+            reverse('posts:post_live', args=[self.post.pk])
+        ).streaming_content)
+        self.next_event(stream)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='Свежий комментарий')
+        self.assertTrue(self.next_event(stream).startswith('event: comment'))
+        delta = self.client.get(
+            reverse('posts:post_new_comments', args=[self.post.pk]),
+            {'since': since}).json()
+        self.assertIn('Свежий комментарий', delta['html'])
+
+    def test_deltas_not_cached_publicly(self):
+        """Общий кэш не должен отдавать устаревшие догрузки."""
+        since = self.client.get(reverse('posts:index')).context['live_since']
+        urls = (reverse('posts:index_new'),
+                reverse('posts:post_new_comments', args=[self.post.pk]))
+        for url in urls:
+            with self.subTest(url=url):
+                cache_control = self.client.get(
+                    url, {'since': since})['Cache-Control']
+                self.assertIn('private', cache_control)
+                self.assertIn('no-cache', cache_control)
+                self.assertNotIn('public', cache_control)
+
+    @override_settings(LIVE_STREAM_TIMEOUT=0.05)
+    def test_stream_ends_after_timeout(self):
+        """Поток закрывается сам, браузер переподключится."""
+        chunks = list(self.client.get(
+            reverse('posts:index_live')).streaming_content)
+        self.assertTrue(chunks[0].startswith(b'retry:'))
+        self.assertIn(b': ping\n\n', chunks)
+
+    def test_asgi_stream_without_threads(self):
+        """Под ASGI поток событий ждёт в цикле и чистится при отключении."""
+        scope = {
+            'type': 'http', 'http_version': '1.1', 'method': 'GET',
+            'path': reverse('posts:index_live'), 'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        }
+        chunks = []
+
+        async def run():
+            gone = asyncio.Event()
+            requested = []
+
+            async def receive():
+                if not requested:
+                    requested.append(True)
+                    return {'type': 'http.request', 'body': b''}
+                await gone.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                chunks.append(message.get('body', b''))
+                if b'event: post' in chunks[-1]:
+                    gone.set()
+                elif len(chunks) == 2:
+                    # подписка оформлена: публикуем из другого потока
+                    threading.Thread(target=hub.publish, args=(
+                        'index', 'post', {'id': 0})).start()
+
+            await asyncio.wait_for(application(scope, receive, send), 5)
+
+        asyncio.run(run())
+        self.assertIn(b'event: post\ndata: {"id": 0}\n\n', chunks)
+        self.assertEqual(hub.subscribers('index'), 0)
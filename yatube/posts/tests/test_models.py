@@ -1,5 +1,6 @@
 from django.test import TestCase
-from ..models import User, LEN_POST, Group, Post
+from ..models import (User, LEN_POST, Group, Post, Comment, Follow,
+                      UserCounters)
 
 
 class PostModelTest(TestCase):
@@ -25,3 +26,37 @@ class PostModelTest(TestCase):
         for value, text in values.items():
             with self.subTest(value=value):
                 self.assertEqual(value, text)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def refresh(self, user):
+        return UserCounters.objects.get(user=user)
+
+    def test_post_and_comment_counters(self):
+        """Счётчики постов и комментариев следуют за данными."""
+        post = Post.objects.create(author=self.author, text='Текст')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.refresh(self.author).posts_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        post.delete()
+        self.assertEqual(self.refresh(self.author).posts_count, 0)
+
+    def test_follow_counters(self):
+        """Счётчики подписчиков и подписок следуют за данными."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.refresh(self.author).followers_count, 1)
+        self.assertEqual(self.refresh(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.refresh(self.author).followers_count, 0)
+        self.assertEqual(self.refresh(self.reader).following_count, 0)
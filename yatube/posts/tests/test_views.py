@@ -4,8 +4,12 @@ from django.urls import reverse
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from ..utils import TEN_PAGES
-from ..models import Group, Post, Follow, User
+from ..caching import bump_feeds, bump_post_feeds, feed_key
+from ..utils import COMMENTS_PAGE, TEN_PAGES
+from ..models import (Comment, Group, Post, Follow, SearchEntry,
+                      TimelineEntry, User)
+from ..search import COMMENT_WEIGHT
+from ..syndication import _snapshot_key
 
 THREE_PAGES = 3
 
@@ -151,21 +155,76 @@ class PostPagesTests(TestCase):
                          'поста нет в группе другого пользователя')
 
     def test_cache_index(self):
-        """Проверка и очистка кэша для index."""
-        response = self.authorized_client.get(reverse('posts:index'))
+        """Проверка и очистка кэша для index (страницы анонимов)."""
+        response = self.client.get(reverse('posts:index'))
         posts = response.content
-        Post.objects.create(
-            text='Тестовый текст',
-            group=self.group,
-            author=self.user)
-        response_old = self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        response_old = self.client.get(reverse('posts:index'))
         posts_old = response_old.content
         self.assertEqual(posts_old, posts)
         cache.clear()
-        response_new = self.authorized_client.get(reverse('posts:index'))
+        response_new = self.client.get(reverse('posts:index'))
         posts_new = response_new.content
         self.assertNotEqual(posts_old, posts_new)
 
+    def test_post_card_fragment_cache(self):
+        """Карточка поста кэшируется до редактирования поста."""
+        self.authorized_client.get(reverse('posts:index'))
+        Post.objects.filter(pk=self.post.pk).update(text='Без сигналов')
+        bump_feeds(feed_key('index'))
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Без сигналов')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            data={'text': 'Отредактированный текст',
+                  'group': self.group.id})
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Отредактированный текст')
+
+    def test_post_card_refreshed_on_rename(self):
+        """Переименование группы и автора видно в закэшированных лентах."""
+        urls = (reverse('posts:index'),
+                reverse('posts:group_list',
+                        kwargs={'slug': self.group.slug}))
+        for url in urls:
+            self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        author = User.objects.get(pk=self.user.pk)
+        author.first_name = 'Новое'
+        author.last_name = 'Имя'
+        author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Группа: Новое название')
+                self.assertContains(response, 'Новое Имя')
+
+    def test_login_keeps_post_cards(self):
+        """Вход пользователя не меняет версии его карточек."""
+        version = Post.objects.get(pk=self.post.pk).version
+        self.client.force_login(self.user)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).version, version)
+
+    def test_cache_invalidated_by_new_post(self):
+        """Новый пост сразу сбрасывает кэш всех своих лент."""
+        urls = (reverse('posts:index'),
+                reverse('posts:group_list',
+                        kwargs={'slug': self.group.slug}),
+                reverse('posts:profile',
+                        kwargs={'username': self.user.username}))
+        for url in urls:
+            self.authorized_client.get(url)
+        post = Post.objects.create(
+            text='Свежий пост',
+            group=self.group,
+            author=self.user)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertIn(post, response.context['page_obj'])
+
 
 class PaginatorViewsTest(TestCase):
     """Тестирование паджинатора."""
@@ -209,6 +268,341 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context['page_obj']),
                                  THREE_PAGES)
 
+    def test_cursor_pages(self):
+        """Курсорная пагинация проходит ленту без пропусков."""
+        for pages in self.page_names:
+            with self.subTest(pages=pages):
+                first = self.client.get(pages + '?cursor=')
+                page_obj = first.context['page_obj']
+                self.assertEqual(len(page_obj), TEN_PAGES)
+                self.assertFalse(page_obj.has_previous())
+                second = self.client.get(
+                    pages + f'?cursor={page_obj.next_cursor}')
+                second_obj = second.context['page_obj']
+                self.assertEqual(len(second_obj), THREE_PAGES)
+                self.assertFalse(second_obj.has_next())
+                self.assertEqual(
+                    {post.pk for post in page_obj}
+                    | {post.pk for post in second_obj},
+                    set(Post.objects.values_list('pk', flat=True)))
+                back = self.client.get(
+                    pages + f'?cursor={second_obj.previous_cursor}')
+                self.assertEqual(list(back.context['page_obj']),
+                                 list(page_obj))
+
+    def test_numbered_page_links_to_cursor(self):
+        """«Следующая» на нумерованной странице ведёт на курсор."""
+        for pages in self.page_names:
+            with self.subTest(pages=pages):
+                first = self.client.get(pages)
+                page_obj = first.context['page_obj']
+                self.assertContains(
+                    first, f'?cursor={page_obj.next_cursor}')
+                self.assertContains(first, '?page=2')
+                second = self.client.get(
+                    pages + f'?cursor={page_obj.next_cursor}')
+                self.assertEqual(
+                    list(second.context['page_obj']),
+                    list(self.client.get(
+                        pages + '?page=2').context['page_obj']))
+
+    def test_cursor_invalid_token(self):
+        """Испорченный курсор отдаёт первую страницу."""
+        response = self.client.get(
+            reverse('posts:index') + '?cursor=broken')
+        self.assertEqual(len(response.context['page_obj']), TEN_PAGES)
+
+
+class CommentsPaginationTest(TestCase):
+    """Комментарии поста загружаются страницами по курсору."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Тестовый текст',
+                                       author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(COMMENTS_PAGE + THREE_PAGES))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_first_page_and_more(self):
+        """На странице поста — первая порция, остальное по кнопке."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.id,)))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PAGE)
+        self.assertTrue(comments.has_next())
+        fragment = self.client.get(
+            reverse('posts:post_comments', args=(self.post.id,)),
+            {'cursor': comments.next_cursor}).json()
+        self.assertEqual(fragment['html'].count('media-body'),
+                         THREE_PAGES)
+        self.assertIsNone(fragment['next'])
+        seen = {comment.pk for comment in comments}
+        self.assertEqual(len(seen), COMMENTS_PAGE)
+        self.assertEqual(Comment.objects.exclude(pk__in=seen).count(),
+                         THREE_PAGES)
+
+    def test_query_count_does_not_depend_on_comments(self):
+        """Число запросов страницы комментариев постоянно."""
+        url = reverse('posts:post_comments', args=(self.post.id,))
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+
+class QueryCountViewsTest(TestCase):
+    """Число запросов страницы не зависит от числа постов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test_group')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(TEN_PAGES):
+            cls.post = Post.objects.create(text=f'Тестовый текст {i}',
+                                           group=cls.group,
+                                           author=cls.author)
+            Comment.objects.create(post=cls.post,
+                                   author=cls.reader,
+                                   text=f'Комментарий {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_views_query_budget(self):
+        """Связанные объекты загружаются вместе с постами.
+
+        ETag и Last-Modified лент берутся из кэша, у поста и ленты
+        подписок — один запрос.
+        """
+        budgets = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}): 5,
+            reverse('posts:profile',
+                    kwargs={'username': self.author.username}): 6,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.post.id}): 5,
+            reverse('posts:follow_index'): 5,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(budget):
+                    self.authorized_client.get(url)
+
+
+class ConditionalGetViewsTest(TestCase):
+    """Условный GET и заголовки кэширования HTML-страниц."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_auth')
+        cls.post = Post.objects.create(text='Тестовый текст',
+                                       author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_not_modified(self):
+        """Страница с тем же ETag отвечает 304, пока не изменится."""
+        urls = (reverse('posts:index'),
+                reverse('posts:profile',
+                        kwargs={'username': self.user.username}),
+                reverse('posts:post_detail',
+                        kwargs={'post_id': self.post.id}))
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='Комментарий')
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cache_control(self):
+        """Анонимам — публичный кэш, авторизованным — приватный."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertFalse(response.has_header('Expires'))
+        self.client.force_login(self.user)
+        response = self.client.get(url)
+        self.assertIn('private', response['Cache-Control'])
+
+
+class SearchViewsTest(TestCase):
+    """Поиск по обратному индексу."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='searcher')
+        cls.group = Group.objects.create(title='Котики',
+                                         slug='cats',
+                                         description='Про котов')
+        cls.text_post = Post.objects.create(
+            text='Ёжик и котики', author=cls.user)
+        cls.group_post = Post.objects.create(
+            text='Просто пост', author=cls.user, group=cls.group)
+        cls.other_post = Post.objects.create(
+            text='Совсем другое', author=cls.user)
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_ranks_text_above_group(self):
+        """Совпадение в тексте весит больше, чем в названии группы."""
+        self.assertEqual(self.search('КОТИКИ'),
+                         [self.text_post, self.group_post])
+        self.assertEqual(self.search('ежик котики'), [self.text_post])
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при правке поста и комментариях."""
+        Comment.objects.create(post=self.other_post, author=self.user,
+                               text='Неожиданный комментарий')
+        self.assertEqual(self.search('неожиданный'), [self.other_post])
+        self.text_post.text = 'Переписанный текст'
+        self.text_post.save()
+        self.assertEqual(self.search('ёжик'), [])
+
+    def test_comment_terms_indexed_incrementally(self):
+        """Комментарий меняет веса только своих слов, не трогая пост."""
+        entries = SearchEntry.objects.filter(post=self.text_post)
+        weights = dict(entries.values_list('term', 'weight'))
+        ids = set(entries.values_list('pk', flat=True))
+        comment = Comment.objects.create(
+            post=self.text_post, author=self.user, text='Котики, ура!')
+        self.assertEqual(entries.get(term='котики').weight,
+                         weights['котики'] + COMMENT_WEIGHT)
+        self.assertEqual(entries.get(term='ура').weight, COMMENT_WEIGHT)
+        self.assertTrue(ids <= set(entries.values_list('pk', flat=True)))
+        comment.delete()
+        self.assertEqual(dict(entries.values_list('term', 'weight')),
+                         weights)
+
+    def test_group_save_without_text_changes(self):
+        """Без правки названия и описания посты группы не
+        переиндексируются."""
+        self.group.save()
+        self.assertEqual(self.search('котов'), [self.group_post])
+        SearchEntry.objects.filter(post=self.group_post).delete()
+        self.group.save()
+        self.assertEqual(self.search('котов'), [])
+        self.group.description = 'Про котов и кошек'
+        self.group.save()
+        self.assertEqual(self.search('кошек'), [self.group_post])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по тому же индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'котики'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+class SyndicationViewsTest(TestCase):
+    """RSS и Atom ленты из готовых снимков."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(title='Тестовая группа',
+                                         slug='test-slug',
+                                         description='Тестовое описание')
+        cls.other_group = Group.objects.create(title='Другая группа',
+                                               slug='other-slug',
+                                               description='Описание')
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(text='Первый пост',
+                                        author=self.user,
+                                        group=self.group)
+
+    def test_feeds_served_from_snapshot(self):
+        """Лента отдаётся из снимка без запросов к базе."""
+        urls = (reverse('posts:index_feed', args=('atom',)),
+                reverse('posts:group_feed', args=('test-slug', 'rss')),
+                reverse('posts:profile_feed', args=('writer', 'atom')))
+        for url in urls:
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('public', response['Cache-Control'])
+                self.assertIn('Первый пост', response.content.decode())
+
+    def test_feed_not_modified_until_change(self):
+        """ETag ленты меняется только при изменении постов."""
+        url = reverse('posts:index_feed', args=('rss',))
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(text='Второй пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Второй пост', response.content.decode())
+
+    def test_group_feed_follows_post(self):
+        """Пост, перенесённый в другую группу, уходит из прежней ленты."""
+        self.post.group = self.other_group
+        self.post.save()
+        old = self.client.get(
+            reverse('posts:group_feed', args=('test-slug', 'atom')))
+        new = self.client.get(
+            reverse('posts:group_feed', args=('other-slug', 'atom')))
+        self.assertNotIn('Первый пост', old.content.decode())
+        self.assertIn('Первый пост', new.content.decode())
+
+    def test_thumbnail_save_keeps_snapshots(self):
+        """Сохранение полей, которых нет в ленте, её не перерисовывает."""
+        cache.clear()
+        self.post.thumbnail_ready = True
+        self.post.save(update_fields=['thumbnail_ready', 'version'])
+        self.assertIsNone(cache.get(_snapshot_key('rss', 'index')))
+        self.post.text = 'Исправленный пост'
+        self.post.save(update_fields=['text', 'version'])
+        self.assertIsNotNone(cache.get(_snapshot_key('rss', 'index')))
+
+    def test_renamed_feeds_dropped(self):
+        """Снимки по старым адресу группы и имени автора удаляются."""
+        old_keys = (_snapshot_key('atom', 'group', 'test-slug'),
+                    _snapshot_key('atom', 'profile', 'writer'))
+        self.assertTrue(all(cache.get(key) for key in old_keys))
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed-slug'
+        group.save()
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'renamed'
+        user.save()
+        self.assertEqual(cache.get_many(old_keys), {})
+        response = self.client.get(
+            reverse('posts:group_feed', args=('renamed-slug', 'atom')))
+        self.assertIn('Первый пост', response.content.decode())
+
+    def test_unknown_feed(self):
+        """Несуществующие группа, автор или формат — 404."""
+        urls = (reverse('posts:index_feed', args=('json',)),
+                reverse('posts:group_feed', args=('missing', 'rss')),
+                reverse('posts:profile_feed', args=('missing', 'rss')))
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
+
 
 class FollowViewsTest(TestCase):
     """Тестирование работы подписок"""
@@ -269,3 +663,62 @@ class FollowViewsTest(TestCase):
             args=(self.author.username,))
         self.assertEqual = (response.context['page_obj'][0].text,
                             post.text)
+
+    def test_cached_pages_not_shared_between_users(self):
+        """Пользователь не видит в ленте чужое имя и чужую подписку."""
+        cache.clear()
+        Follow.objects.create(user=self.follower, author=self.author)
+        other = User.objects.create(username='Другой')
+        other_client = Client()
+        other_client.force_login(other)
+        urls = (reverse('posts:index'),
+                reverse('posts:profile', args=(self.author.username,)))
+        for url in urls:
+            with self.subTest(url=url):
+                page = self.authorized_client.get(url)
+                self.assertContains(page, 'Пользователь: Подписчик')
+                page = other_client.get(url).content.decode()
+                self.assertIn('Пользователь: Другой', page)
+                self.assertNotIn('Пользователь: Подписчик', page)
+                page = self.guest_client.get(url).content.decode()
+                self.assertNotIn('Пользователь:', page)
+        page = other_client.get(urls[1])
+        self.assertContains(page, 'Подписаться')
+        self.assertNotContains(page, 'Отписаться')
+
+    def test_new_post_cost_independent_of_followers(self):
+        """Новый пост не перебирает подписчиков, а их ленты меняются."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        url = reverse('posts:follow_index')
+        etag = self.authorized_client.get(url)['ETag']
+        post = Post.objects.create(author=self.author, text='Пост')
+        post = Post.objects.select_related('author', 'group').get(pk=post.pk)
+        with self.assertNumQueries(0):
+            bump_post_feeds(post)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(post, response.context['page_obj'])
+
+    def test_timeline_fan_out(self):
+        """Посты автора попадают в ленту подписчика и уходят из неё."""
+        old_post = Post.objects.create(
+            author=self.author,
+            text='Старый пост')
+        self.authorized_client.get(
+            reverse('posts:profile_follow',
+                    args=(self.author.username,)))
+        new_post = Post.objects.create(
+            author=self.author,
+            text='Новый пост')
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(
+                user=self.follower).values_list('post', flat=True)),
+            {old_post.pk, new_post.pk})
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']),
+                         [new_post, old_post])
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow',
+                    args=(self.author.username,)))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.follower).exists())
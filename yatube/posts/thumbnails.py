@@ -0,0 +1,135 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from .models import ThumbnailJob
+
+logger = logging.getLogger(__name__)
+
+# Карточка поста: 960x339 и адаптивные варианты той же пропорции
+CARD_WIDTH = 960
+CARD_HEIGHT = 339
+CARD_OPTIONS = {'crop': 'center', 'upscale': True}
+RESPONSIVE_WIDTHS = (480, 960, 1440)
+# Современные форматы в порядке предпочтения; JPEG — запасной
+MODERN_FORMATS = (('AVIF', 'image/avif'), ('WEBP', 'image/webp'))
+MAX_ATTEMPTS = 3
+STALE_AFTER = timedelta(minutes=10)
+
+_executor = None
+
+
+def modern_formats():
+    """Форматы, которые умеет кодировать установленный Pillow."""
+    Image.init()
+    return [(image_format, mime) for image_format, mime in MODERN_FORMATS
+            if image_format in Image.SAVE]
+
+
+def card_variant(width, image_format='JPEG'):
+    """Геометрия и опции sorl для карточки заданной ширины."""
+    height = round(width * CARD_HEIGHT / CARD_WIDTH)
+    return f'{width}x{height}', dict(CARD_OPTIONS, format=image_format)
+
+
+def thumbnail_sizes():
+    """Все размеры и форматы, которые запрашивают шаблоны."""
+    formats = [image_format for image_format, _ in modern_formats()]
+    return [card_variant(width, image_format)
+            for width in RESPONSIVE_WIDTHS
+            for image_format in formats + ['JPEG']]
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POSTS_THUMBNAIL_THREADS,
+            thread_name_prefix='thumbnails')
+    return _executor
+
+
+def enqueue(post):
+    """Ставит сборку миниатюр поста в очередь.
+
+    Задание сохраняется в базе; если включён пул потоков,
+    оно запускается сразу после коммита транзакции. Идущее задание
+    для прежней картинки не переиспользуется.
+    """
+    job, _ = ThumbnailJob.objects.get_or_create(
+        post=post, image=post.image.name, finished__isnull=True)
+    if getattr(settings, 'POSTS_THUMBNAIL_THREADS', 0):
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run_in_thread, job.pk))
+    return job
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_job(job_id)
+    except Exception:
+        logger.exception('Сборка миниатюр %s упала', job_id)
+    finally:
+        close_old_connections()
+
+
+def pending_jobs():
+    """Незавершённые задания, включая зависшие у упавших воркеров."""
+    stale = timezone.now() - STALE_AFTER
+    return ThumbnailJob.objects.filter(
+        finished__isnull=True, started__isnull=True
+    ) | ThumbnailJob.objects.filter(
+        finished__isnull=True, started__lt=stale)
+
+
+def run_job(job_id):
+    """Собирает миниатюры; True, если задание выполнил этот вызов."""
+    now = timezone.now()
+    claimed = pending_jobs().filter(pk=job_id).update(started=now)
+    if not claimed:
+        return False
+    job = ThumbnailJob.objects.select_related('post').get(pk=job_id)
+    post = job.post
+    if post.image.name != job.image:
+        # картинку заменили: её миниатюры соберёт новое задание
+        _finish(job)
+        return False
+    try:
+        for geometry, options in thumbnail_sizes():
+            get_thumbnail(post.image, geometry, **options)
+    except Exception as error:
+        job.attempts += 1
+        job.error = str(error)
+        if job.attempts < MAX_ATTEMPTS:
+            job.started = None
+            job.save(update_fields=['attempts', 'error', 'started'])
+            return False
+        # пост так и остаётся с заглушкой вместо картинки
+        logger.warning('Миниатюры поста %s не собраны: %s', post.pk, error)
+        _finish(job)
+        return False
+    _finish(job)
+    post.refresh_from_db()
+    if post.image.name != job.image:
+        return False
+    post.thumbnail_ready = True
+    post.save(update_fields=['thumbnail_ready', 'version'])
+    return True
+
+
+def _finish(job):
+    job.finished = timezone.now()
+    job.save()
+
+
+def mark_pending(post):
+    """Помечает пост как ожидающий миниатюр (новая картинка)."""
+    if post.image:
+        post.thumbnail_ready = False
@@ -0,0 +1,58 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile
+from PIL import Image, ImageOps
+
+# Форматы, которые перекодируются; GIF (анимация) сохраняется как есть
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 85, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'WEBP': {'quality': 80, 'method': 4},
+}
+# Из image.info в файл переносится только прозрачность: кодировщики
+# PNG и WEBP иначе запишут EXIF, ICC-профиль и текстовые блоки
+KEPT_INFO = ('transparency',)
+
+
+def normalize_image(upload):
+    """Приводит загруженную картинку к разумному размеру.
+
+    Размеры проверяются по заголовку, без декодирования пикселей.
+    Затем картинка поворачивается по EXIF, уменьшается до
+    POSTS_IMAGE_MAX_SIDE и перекодируется без метаданных.
+    """
+    if upload.size > settings.POSTS_IMAGE_MAX_BYTES:
+        raise ValidationError(
+            'Файл слишком большой: не более %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': settings.POSTS_IMAGE_MAX_BYTES // 2 ** 20})
+    upload.seek(0)
+    image = Image.open(upload)
+    width, height = image.size
+    if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Слишком большое разрешение: %(width)dx%(height)d.',
+            code='too_many_pixels',
+            params={'width': width, 'height': height})
+    image_format = image.format
+    if image_format not in SAVE_OPTIONS:
+        upload.seek(0)
+        return upload
+    max_side = settings.POSTS_IMAGE_MAX_SIDE
+    # JPEG декодируется сразу в уменьшенном масштабе
+    image.draft(image.mode, (max_side, max_side))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image.info = {key: value for key, value in image.info.items()
+                  if key in KEPT_INFO}
+    buffer = BytesIO()
+    image.save(buffer, format=image_format, **SAVE_OPTIONS[image_format])
+    return InMemoryUploadedFile(
+        buffer,
+        field_name=getattr(upload, 'field_name', None),
+        name=upload.name,
+        content_type=Image.MIME[image_format],
+        size=buffer.tell(),
+        charset=None)
@@ -7,6 +7,28 @@ app_name = 'posts'
 urlpatterns = [
     # главная
     path('', views.index, name='index'),
+    # живые обновления главной: поток событий и новые посты
+    path('live/',
+         views.live_stream,
+         {'feed': 'index'},
+         name='index_live'),
+    path('live/new/',
+         views.live_posts,
+         {'feed': 'index'},
+         name='index_new'),
+    # RSS и Atom ленты
+    path('feed/<str:feed_format>/',
+         views.syndication_feed,
+         {'feed': 'index'},
+         name='index_feed'),
+    path('group/<slug:slug>/feed/<str:feed_format>/',
+         views.syndication_feed,
+         {'feed': 'group'},
+         name='group_feed'),
+    path('profile/<str:username>/feed/<str:feed_format>/',
+         views.syndication_feed,
+         {'feed': 'profile'},
+         name='profile_feed'),
     # посты группы
     path('group/<slug:slug>/',
          views.group_posts,
@@ -31,10 +53,35 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
+    # следующие страницы комментариев
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
+    # живые обновления поста: поток событий и новые комментарии
+    path('posts/<int:post_id>/live/',
+         views.live_stream,
+         {'feed': 'post'},
+         name='post_live'),
+    path('posts/<int:post_id>/comments/new/',
+         views.post_new_comments,
+         name='post_new_comments'),
+    # поиск по постам
+    path('search/',
+         views.search,
+         name='search'),
     # страница подписок
     path('follow/',
          views.follow_index,
          name='follow_index'),
+    # живые обновления подписок
+    path('follow/live/',
+         views.live_stream,
+         {'feed': 'follow'},
+         name='follow_live'),
+    path('follow/new/',
+         views.live_posts,
+         {'feed': 'follow'},
+         name='follow_new'),
     # страница подписки на автора
     path('profile/<str:username>/follow/',
          views.profile_follow,
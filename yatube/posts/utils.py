@@ -1,9 +1,256 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+from contextlib import contextmanager
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Post, TimelineEntry
 
 TEN_PAGES = 10
+COMMENTS_PAGE = 20
+CURSOR_PARAM = 'cursor'
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Позволяет задать даты полей с auto_now_add при bulk_create."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def encode_cursor(pub_date, pk, direction):
+    """Непрозрачный токен позиции (дата, id) в ленте."""
+    raw = f'{direction}|{pub_date.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Разбор токена; для испорченного токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, pub_date, pk = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None or direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+        return None
+    return direction, pub_date, pk
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации.
+
+    Номер страницы неизвестен, вместо него шаблон получает токены
+    соседних страниц.
+    """
+    def __init__(self, object_list, paginator,
+                 has_next=False, has_previous=False):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = None
+        self.previous_cursor = None
+        if object_list and has_next:
+            self.next_cursor = encode_cursor(
+                *paginator.key(object_list[-1]), CURSOR_NEXT)
+        if object_list and has_previous:
+            self.previous_cursor = encode_cursor(
+                *paginator.key(object_list[0]), CURSOR_PREVIOUS)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Стоимость любой страницы одинакова: один запрос по индексу
+    с LIMIT per_page + 1. pk_field задаёт поле второго ключа,
+    если id поста хранится не в первичном ключе (лента подписок),
+    date_field — поле даты (created у комментариев).
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, pk_field='pk',
+                 date_field='pub_date'):
+        self.pk_field = pk_field
+        self.date_field = date_field
+        super().__init__(
+            object_list.order_by(f'-{date_field}', f'-{pk_field}'),
+            per_page)
+
+    def key(self, obj):
+        return getattr(obj, self.date_field), getattr(obj, self.pk_field)
+
+    def _keyset(self, date, pk, lookup):
+        # диапазон по дате отдельным условием, чтобы он шёл в индекс
+        return Q(**{f'{self.date_field}__{lookup}e': date}) & (
+            Q(**{f'{self.date_field}__{lookup}': date})
+            | Q(**{f'{self.pk_field}__{lookup}': pk}))
+
+    def after(self, date, pk):
+        """Условие «после ключа» в порядке убывания."""
+        return self._keyset(date, pk, 'lt')
+
+    def before(self, date, pk):
+        return self._keyset(date, pk, 'gt')
+
+    def get_page(self, token):
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return self._first_page()
+        direction, date, pk = cursor
+        if direction == CURSOR_NEXT:
+            rows = list(self.object_list.filter(
+                self.after(date, pk))[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self,
+                              has_next=len(rows) > self.per_page,
+                              has_previous=True)
+        rows = list(self.object_list.reverse().filter(
+            self.before(date, pk))[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not has_previous:
+            return self._first_page()
+        return CursorPage(rows, self, has_next=True, has_previous=True)
+
+    def newer(self, token):
+        """Объекты новее позиции токена, новые — первыми.
+
+        None — если токен испорчен или новых больше страницы: такую
+        ленту проще перезагрузить целиком.
+        """
+        cursor = decode_cursor(token) if token else None
+        if cursor is None:
+            return None
+        _, date, pk = cursor
+        rows = list(self.object_list.reverse().filter(
+            self.before(date, pk))[:self.per_page + 1])
+        if len(rows) > self.per_page:
+            return None
+        return rows[::-1]
+
+    def _first_page(self):
+        rows = list(self.object_list[:self.per_page + 1])
+        return CursorPage(rows[:self.per_page], self,
+                          has_next=len(rows) > self.per_page)
+
+
+def padinator_page(queryset, request, pk_field='pk'):
+    """Страница ленты.
+
+    По умолчанию нумерованная пагинация; при наличии параметра
+    cursor в запросе — курсорная, не зависящая от глубины страницы.
+    Ссылка «Следующая» нумерованной страницы ведёт на курсор
+    (next_cursor), так что листание вглубь идёт без OFFSET.
+    """
+    if CURSOR_PARAM in request.GET:
+        return CursorPaginator(queryset, TEN_PAGES, pk_field).get_page(
+            request.GET.get(CURSOR_PARAM))
+    # тот же порядок, что у курсоров: страницы стыкуются без пропусков
+    paginator = Paginator(
+        queryset.order_by('-pub_date', f'-{pk_field}'), TEN_PAGES)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    page_obj.next_cursor = None
+    if page_obj.has_next():
+        last = page_obj[-1]
+        page_obj.next_cursor = encode_cursor(
+            last.pub_date, getattr(last, pk_field), CURSOR_NEXT)
+    return page_obj
+
+
+def _timeline(user):
+    return TimelineEntry.objects.filter(
+        user=user
+    ).select_related(
+        'post__author', 'post__group'
+    ).order_by('-pub_date', '-post_id')
+
+
+def timeline_page(user, request):
+    """Страница ленты подписок: читается из TimelineEntry по индексу."""
+    page_obj = padinator_page(_timeline(user), request, pk_field='post_id')
+    page_obj.object_list = [entry.post for entry in page_obj]
+    return page_obj
+
+
+def live_cursor(page_obj, date_field='pub_date', floor=None):
+    """Токен, от которого догружаются новые объекты над первой страницей.
+
+    На остальных страницах — None: новое там сверху не показывается.
+    Для пустой страницы новым считается всё позже floor (по умолчанию
+    — позже рендера).
+    """
+    if page_obj.has_previous():
+        return None
+    if len(page_obj):
+        first = page_obj[0]
+        key = getattr(first, date_field), first.pk
+    else:
+        key = floor or timezone.now(), 0
+    return encode_cursor(*key, CURSOR_PREVIOUS)
+
+
+def new_posts(feed, user, token):
+    """Посты ленты index или follow новее токена и токен самого нового.
+
+    None, если догрузить нельзя и ленту надо перезагрузить.
+    """
+    if feed == 'follow':
+        rows = CursorPaginator(_timeline(user), TEN_PAGES,
+                               'post_id').newer(token)
+        posts = rows and [entry.post for entry in rows]
+    else:
+        posts = CursorPaginator(
+            Post.objects.select_related('author', 'group'),
+            TEN_PAGES).newer(token)
+    if posts is None:
+        return None
+    if posts:
+        token = encode_cursor(posts[0].pub_date, posts[0].pk,
+                              CURSOR_PREVIOUS)
+    return posts, token
+
+
+def comments_page(post, token):
+    """Страница комментариев поста, новые — первыми, с авторами."""
+    return CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_PAGE,
+        date_field='created').get_page(token)
 
 
-def padinator_page(queryset, request):
-    paginator = Paginator(queryset, TEN_PAGES)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+def new_comments(post, token):
+    """Комментарии новее токена и токен самого нового; None — перезагрузить."""
+    comments = CursorPaginator(
+        post.comments.select_related('author'), COMMENTS_PAGE,
+        date_field='created').newer(token)
+    if comments is None:
+        return None
+    if comments:
+        token = encode_cursor(comments[0].created, comments[0].pk,
+                              CURSOR_PREVIOUS)
+    return comments, token
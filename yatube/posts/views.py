@@ -1,27 +1,52 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import (Http404, HttpResponse, HttpResponseForbidden,
+                         JsonResponse, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, render, redirect
-from django.views.decorators.cache import cache_page
+from django.template.loader import render_to_string
+from django.utils.cache import (get_conditional_response,
+                                patch_cache_control)
+from django.utils.http import http_date
 
+from . import comment_queue, live
+from .caching import (PUBLIC_MAX_AGE, cache_feed, follow_conditions,
+                      group_conditions, index_conditions, post_conditions,
+                      private_revalidated, profile_conditions,
+                      public_for_anonymous)
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Follow, User
-from .utils import padinator_page
+from .models import Group, Post, Follow, User, UserCounters
+from .search import search_posts
+from .syndication import FEED_FORMATS, get_snapshot
+from .utils import (CURSOR_PARAM, TEN_PAGES, comments_page, live_cursor,
+                    new_comments, new_posts, padinator_page,
+                    timeline_page)
 
 
-@cache_page(20, key_prefix='index_page')
+@public_for_anonymous
+@index_conditions
+@cache_feed('index')
 def index(request):
     """"Главная страница"""
-    page_obj = padinator_page(Post.objects.all(), request)
+    page_obj = padinator_page(
+        Post.objects.select_related('author', 'group'), request)
     context = {
         'page_obj': page_obj,
+        'live_since': live_cursor(page_obj),
     }
     return render(request, 'posts/index.html', context)
 
 
+@public_for_anonymous
+@group_conditions
+@cache_feed('group', 'slug')
 def group_posts(request, slug):
     """"Страница группы постов"""
     group = get_object_or_404(Group, slug=slug)
-    page_obj = padinator_page(Post.objects.filter(group=group),
-                              request)
+    page_obj = padinator_page(
+        group.posts.select_related('author', 'group'), request)
     context = {
         'group': group,
         'page_obj': page_obj,
@@ -29,11 +54,15 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@public_for_anonymous
+@profile_conditions
+@cache_feed('profile', 'username')
 def profile(request, username):
     """"Страница всех постов автора"""
-    author = get_object_or_404(User, username=username)
-    page_obj = padinator_page(Post.objects.filter(author=author).all(),
-                              request)
+    author = get_object_or_404(
+        User.objects.select_related('counters'), username=username)
+    page_obj = padinator_page(
+        author.posts.select_related('author', 'group'), request)
     following_flag = (
         request.user.is_authenticated
         and Follow.objects.filter(
@@ -41,27 +70,141 @@ def profile(request, username):
             author=author).exists())
     context = {
         'author': author,
+        'counters': UserCounters.of(author),
         'page_obj': page_obj,
         'following': following_flag,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@public_for_anonymous
+@post_conditions
 def post_detail(request, post_id):
     """"Страница редактирования постов"""
-    post = get_object_or_404(Post, pk=post_id)
-    posts_count = Post.objects.filter(author=post.author).count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        pk=post_id)
+    posts_count = UserCounters.of(post.author).posts_count
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = comments_page(post, request.GET.get('comments'))
+    pending_comments = []
+    if request.user.is_authenticated:
+        pending_comments = comment_queue.queued_comments(post, request.user)
     context = {
         'post': post,
         'posts_count': posts_count,
         'form': form,
         'comments': comments,
+        'pending_comments': pending_comments,
+        'live_since': live_cursor(comments, 'created', post.pub_date),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@public_for_anonymous
+@post_conditions
+def post_comments(request, post_id):
+    """"Следующая страница комментариев для кнопки «Показать ещё»"""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comments_page(post, request.GET.get(CURSOR_PARAM))
+    return JsonResponse({
+        'html': render_to_string('includes/comment_list.html',
+                                 {'comments': comments}, request),
+        'next': comments.next_cursor,
+    })
+
+
+@private_revalidated
+@post_conditions
+def post_new_comments(request, post_id):
+    """"Комментарии, появившиеся после открытия страницы поста"""
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    delta = new_comments(post, request.GET.get('since'))
+    if delta is None:
+        return JsonResponse({'reload': True})
+    comments, since = delta
+    return JsonResponse({
+        'reload': False,
+        'html': render_to_string('includes/comment_list.html',
+                                 {'comments': comments}, request),
+        'since': since,
+    })
+
+
+@private_revalidated
+def live_posts(request, feed):
+    """"Посты, появившиеся в ленте после открытия страницы"""
+    delta = None
+    if feed == 'index' or request.user.is_authenticated:
+        delta = new_posts(feed, request.user, request.GET.get('since'))
+    if delta is None:
+        return JsonResponse({'reload': True})
+    posts, since = delta
+    return JsonResponse({
+        'reload': False,
+        'html': render_to_string('posts/includes/post_list.html',
+                                 {'posts': posts}, request),
+        'since': since,
+    })
+
+
+def live_stream(request, feed, post_id=None):
+    """"Server-Sent Events о новых постах ленты или комментариях"""
+    if not settings.LIVE_UPDATES:
+        raise Http404('Живые обновления выключены')
+    if feed == 'post':
+        get_object_or_404(Post.objects.only('pk'), pk=post_id)
+        channels = [f'post:{post_id}']
+    elif feed == 'follow':
+        if not request.user.is_authenticated:
+            return HttpResponseForbidden()
+        channels = [f'author:{author_id}' for author_id in
+                    request.user.follower.values_list('author_id',
+                                                      flat=True)]
+    else:
+        channels = ['index']
+    stream = live.EventStream(channels)
+    response = StreamingHttpResponse(stream,
+                                     content_type='text/event-stream')
+    # под yatube.asgi поток ждёт событий в цикле событий, без потока
+    response.async_streaming_content = stream
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def search(request):
+    """"Поиск по постам, комментариям и группам"""
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(
+        search_posts(query).select_related('author', 'group'), TEN_PAGES)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def syndication_feed(request, feed, feed_format, **parts):
+    """"RSS или Atom лента из заранее отрендеренного снимка"""
+    snapshot = None
+    if feed_format in FEED_FORMATS:
+        snapshot = get_snapshot(feed_format, feed, *parts.values())
+    if snapshot is None:
+        raise Http404
+    last_modified = int(snapshot['last_modified'].timestamp())
+    response = get_conditional_response(
+        request, etag=snapshot['etag'], last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(snapshot['body'],
+                                content_type=snapshot['content_type'])
+    response['ETag'] = snapshot['etag']
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=PUBLIC_MAX_AGE)
+    return response
+
+
 @login_required
 def post_create(request):
     """"Функция добавления поста"""
@@ -102,8 +245,16 @@ def post_edit(request, post_id):
 @login_required
 def add_comment(request, post_id):
     """"Комментарии к посту в шаблоне post_detail"""
-    post = get_object_or_404(Post, pk=post_id)
     form = CommentForm(request.POST or None)
+    if comment_queue.enabled():
+        # запись в базу — пачкой в comment_worker; каталог в очереди
+        # заводится только для существующего поста
+        get_object_or_404(Post.objects.only('pk'), pk=post_id)
+        if form.is_valid():
+            comment_queue.enqueue(post_id, request.user.pk,
+                                  form.cleaned_data['text'])
+        return redirect('posts:post_detail', post_id=post_id)
+    post = get_object_or_404(Post, pk=post_id)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -113,14 +264,14 @@ def add_comment(request, post_id):
 
 
 @login_required
+@public_for_anonymous
+@follow_conditions
 def follow_index(request):
     """"Подписаться на автора"""
-    page_obj = padinator_page(
-        Post.objects.filter(
-            author__following__user=request.user),
-        request)
+    page_obj = timeline_page(request.user, request)
     context = {
         'page_obj': page_obj,
+        'live_since': live_cursor(page_obj),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -0,0 +1,19 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``:
+Django 2.2 runs inside core.asgi.AsgiHandler as a WSGI application in a
+thread pool, e.g. ``uvicorn yatube.asgi:application``.
+
+Live updates (posts.live) are enabled here: event streams wait in the
+event loop instead of holding a server thread.
+"""
+import os
+
+os.environ.setdefault('YATUBE_LIVE_UPDATES', '1')
+
+from core.asgi import AsgiHandler  # noqa: E402
+
+from .wsgi import application as wsgi_application  # noqa: E402
+
+application = AsgiHandler(wsgi_application)
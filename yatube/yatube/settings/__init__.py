@@ -0,0 +1,22 @@
+"""Настройки проекта по профилям.
+
+Профиль выбирается переменной окружения YATUBE_ENV: dev (по умолчанию),
+test или prod. Модуль профиля дополняет и переопределяет общие
+настройки из base; его можно указать и напрямую:
+DJANGO_SETTINGS_MODULE=yatube.settings.prod.
+"""
+import os
+from importlib import import_module
+
+from django.core.exceptions import ImproperlyConfigured
+
+PROFILES = ('dev', 'test', 'prod')
+
+_profile = os.environ.get('YATUBE_ENV', 'dev')
+if _profile not in PROFILES:
+    raise ImproperlyConfigured(
+        f'YATUBE_ENV={_profile!r}, ожидается одно из: {", ".join(PROFILES)}')
+globals().update(
+    (name, value)
+    for name, value in vars(import_module(f'{__name__}.{_profile}')).items()
+    if name.isupper())
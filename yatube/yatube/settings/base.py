@@ -0,0 +1,284 @@
+"""
+Django settings for yatube project.
+
+Общие настройки всех профилей; профиль (dev, test, prod) выбирается
+переменной окружения YATUBE_ENV, см. yatube/settings/__init__.py.
+
+Generated by 'django-admin startproject' using Django 2.2.19.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/2.2/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/2.2/ref/settings/
+"""
+
+import os
+import tempfile
+
+# Build paths inside the project like this: os.path.join(BASE_DIR, ...)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+
+# SECRET_KEY задаётся в профилях: в prod — только из окружения
+
+DEBUG = False
+
+ALLOWED_HOSTS = [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+]
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',  # Приложение для регистрации и авторизации пользователей
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',  # Добавленная запись
+    'users.apps.UsersConfig',  # регистрация приложения users
+    'core.apps.CoreConfig',  # приложение core
+    'about.apps.AboutConfig',  # приложение about для статических страниц
+    'api.apps.ApiConfig',  # JSON API лент для мобильных клиентов
+    'sorl.thumbnail',  # приложение для работы с фото
+]
+
+MIDDLEWARE = [
+    # счётчики SQL и журнал медленных запросов и N+1; должен стоять
+    # первым, за ним — замеры времени, шаблонов и кэша
+    'core.middleware.QueryLogMiddleware',
+    'core.middleware.PerformanceMiddleware',
+    # после записи читать из основной базы; до сессий и авторизации
+    'core.middleware.ReplicaPinMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+# Путь к директории с шаблонами вынесен в переменную:
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATES = [
+    {
+        # движок Django, дополнительно замеряющий время рендера
+        'BACKEND': 'core.performance.DjangoTemplates',
+        # Добавлено: Искать шаблоны на уровне проекта
+        'DIRS': [TEMPLATES_DIR],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                # Добавлен контекст-процессор
+                'core.context_processors.year.year',
+                'core.context_processors.live.live_updates',
+            ],
+        },
+    },
+]
+
+# Замер времени каждого шаблона, включая include и extends:
+# итог в логе yatube.performance и в сводке core:performance_stats
+TEMPLATE_PROFILING = False
+# Компилировать все шаблоны при старте wsgi.py; имеет смысл
+# только с кэширующим загрузчиком (профиль prod)
+TEMPLATE_PRELOAD = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+# Потоков, в которых yatube.asgi вызывает Django: ORM и view
+# в Django 2.2 только синхронные
+ASGI_THREADS = 8
+
+
+# Database
+# https://docs.djangoproject.com/en/2.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+    },
+    # реплика для чтения; локально её наполняет manage.py sync_replicas
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db.replica.sqlite3'),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+# Чтения лент уходят на реплики, запись — в default (core.routers)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Алиасы реплик для чтения; пустой список — всё читается из default
+DATABASE_REPLICAS = []
+# Максимальное отставание реплик, секунд: столько после своей записи
+# пользователь читает из default, и столько не кэшируются ленты,
+# сброшенные записью
+REPLICA_MAX_LAG = 10
+
+# PRAGMA для каждого нового соединения SQLite (core.signals).
+# WAL: читатели не ждут писателя; synchronous=NORMAL в режиме WAL
+# не портит базу при сбое. Рост WAL и статистику планировщика
+# обслуживает manage.py sqlite_maintenance (раз в несколько минут)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 2 ** 20,
+    'temp_store': 'MEMORY',
+}
+
+
+# Password validation
+# https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/2.2/topics/i18n/
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/2.2/howto/static-files/
+
+STATIC_URL = '/static/'
+
+STATICFILES_DIRS = (os.path.join(BASE_DIR, 'static'),)
+
+LOGIN_URL = 'users:login'  # адрес для авторизации
+LOGIN_REDIRECT_URL = 'posts:index'  # адрес после успешной авторизации
+# LOGOUT_REDIRECT_URL = 'posts:index'  # адрес при выходе из аккаунта
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Файловый кэш общий для всех воркеров на одном хосте;
+# страницы лент сбрасываются сигналами из posts.signals
+CACHES = {
+    'default': {
+        # файловый кэш, считающий попадания и промахи
+        'BACKEND': 'core.performance.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'yatube_cache'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+}
+
+# Потоки для сборки миниатюр прямо в процессе сайта;
+# 0 — миниатюры собирает только manage.py thumbnail_worker
+POSTS_THUMBNAIL_THREADS = 0
+
+# Каталог очереди комментариев; если задан, комментарии пишутся
+# в базу пачками по POSTS_COMMENT_BATCH через manage.py comment_worker
+POSTS_COMMENT_QUEUE = None
+POSTS_COMMENT_BATCH = 500
+
+# Ограничения на загружаемые картинки постов
+POSTS_IMAGE_MAX_BYTES = 40 * 2 ** 20
+POSTS_IMAGE_MAX_PIXELS = 50_000_000
+POSTS_IMAGE_MAX_SIDE = 2560
+
+# Живые обновления лент через Server-Sent Events (posts.live).
+# Каждый открытый поток событий под WSGI держит поток сервера,
+# поэтому они включаются только под yatube.asgi (он задаёт
+# YATUBE_LIVE_UPDATES=1); без них страницы не открывают потоков,
+# а адреса */live/ отвечают 404.
+LIVE_UPDATES = os.environ.get('YATUBE_LIVE_UPDATES') == '1'
+# Сколько событий ждут медленного подписчика, как часто слать
+# пустой комментарий против обрыва соединения прокси, секунд,
+# сколько держать поток открытым и через сколько мс переподключаться
+LIVE_BACKLOG = 100
+LIVE_HEARTBEAT = 15
+LIVE_STREAM_TIMEOUT = 300
+LIVE_RETRY_MS = 5000
+
+# Адрес сайта для абсолютных ссылок в RSS и Atom лентах и сколько
+# секунд хранится готовый снимок ленты (промах рендерит её заново)
+POSTS_FEED_BASE_URL = 'http://127.0.0.1:8000'
+POSTS_FEED_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+# Журнал SQL (core.queries): запросы дольше QUERY_LOG_SLOW_MS мс
+# (None — выключено) пишутся в QUERY_LOG_FILE; в доле
+# QUERY_LOG_SAMPLE_RATE HTTP-запросов ищутся повторы SQL и N+1
+QUERY_LOG_SLOW_MS = 200
+QUERY_LOG_SAMPLE_RATE = 0.01
+QUERY_LOG_REPEATS = 3
+QUERY_LOG_FILE = os.path.join(tempfile.gettempdir(), 'yatube_queries.log')
+# Метрики запросов PerformanceMiddleware: строка JSON на запрос
+PERFORMANCE_LOG_FILE = os.path.join(tempfile.gettempdir(),
+                                    'yatube_performance.log')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': QUERY_LOG_FILE,
+            'maxBytes': 10 * 2 ** 20,
+            'backupCount': 5,
+            'delay': True,
+        },
+        'performance': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': PERFORMANCE_LOG_FILE,
+            'maxBytes': 10 * 2 ** 20,
+            'backupCount': 5,
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'yatube.queries': {
+            'handlers': ['queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+        'yatube.performance': {
+            'handlers': ['performance'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
@@ -0,0 +1,28 @@
+"""Локальная разработка: отладка, письма в файлы."""
+import os
+
+from .base import *  # noqa: F401,F403
+from .base import BASE_DIR, TEMPLATES
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get(
+    'YATUBE_SECRET_KEY', 'j*6os%a%&q@ml+!$1()p2o^rdv+2b2zq)1h@-8%8+zygtz6ph8')
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'context_processors': [
+            'django.template.context_processors.debug',
+            *TEMPLATES[0]['OPTIONS']['context_processors'],
+        ],
+    },
+}]
+
+#  подключаем движок filebased.EmailBackend
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# указываем директорию, в которую будут складываться файлы писем
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
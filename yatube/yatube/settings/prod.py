@@ -0,0 +1,67 @@
+"""Боевой запуск.
+
+Обязательные переменные окружения: YATUBE_SECRET_KEY и
+YATUBE_ALLOWED_HOSTS (через запятую). Необязательные:
+YATUBE_DATABASE_REPLICAS — алиасы реплик через запятую,
+YATUBE_PERFORMANCE=1 — замеры PerformanceMiddleware (журнал
+медленных SQL и N+1 из QueryLogMiddleware ведётся всегда),
+YATUBE_TEMPLATE_PRELOAD=0 — не компилировать шаблоны при старте
+(быстрее холодный старт, медленнее первые запросы),
+YATUBE_EMAIL_HOST — SMTP-сервер.
+
+Из пути запроса убрано всё, что не нужно без отладки: контекст-процессор
+debug (он в dev), роутер и middleware реплик, пока реплики не заданы,
+и замеры, пока они не включены.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import DATABASES, MIDDLEWARE, TEMPLATES
+
+
+def _required(name):
+    try:
+        return os.environ[name]
+    except KeyError:
+        raise ImproperlyConfigured(f'Не задана переменная окружения {name}')
+
+
+def _list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+SECRET_KEY = _required('YATUBE_SECRET_KEY')
+ALLOWED_HOSTS = _list(_required('YATUBE_ALLOWED_HOSTS'))
+
+DATABASE_REPLICAS = _list(os.environ.get('YATUBE_DATABASE_REPLICAS', ''))
+if not DATABASE_REPLICAS:
+    DATABASES = {'default': DATABASES['default']}
+    DATABASE_ROUTERS = []
+    MIDDLEWARE = [name for name in MIDDLEWARE
+                  if name != 'core.middleware.ReplicaPinMiddleware']
+
+if os.environ.get('YATUBE_PERFORMANCE') != '1':
+    MIDDLEWARE = [name for name in MIDDLEWARE
+                  if name != 'core.middleware.PerformanceMiddleware']
+
+# Шаблоны компилируются один раз на процесс и держатся в памяти;
+# кэширующий загрузчик несовместим с APP_DIRS, поэтому загрузчики
+# шаблонов проекта и приложений перечислены явно
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+    },
+}]
+TEMPLATE_PRELOAD = os.environ.get('YATUBE_TEMPLATE_PRELOAD', '1') == '1'
+
+EMAIL_HOST = os.environ.get('YATUBE_EMAIL_HOST', 'localhost')
@@ -0,0 +1,22 @@
+"""Прогон тестов: manage.py test выбирает этот профиль сам."""
+import os
+import tempfile
+
+from .base import *  # noqa: F401,F403
+from .base import CACHES
+
+SECRET_KEY = 'yatube-tests-only'
+
+# Хэш паролей в тестах не должен быть стойким, он должен быть быстрым
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+
+# Отдельный каталог, чтобы тесты не сбрасывали кэш dev-сервера
+CACHES = {
+    'default': {
+        **CACHES['default'],
+        'LOCATION': os.path.join(tempfile.gettempdir(),
+                                 'yatube_test_cache'),
+    }
+}
@@ -25,6 +25,8 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('stats/', include('core.urls', namespace='core')),
 ]
 
 handler404 = 'core.views.page_not_found'